@@ -0,0 +1,168 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .filters import IngredientFilter, RecipeFilter
+from .pagination import CustomPageNumberPagination
+from .serializers import (IngredientSerializer, RecipeReadSerializer,
+                          SubscriptionSerializer, TagSerializer)
+from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
+                    TagViewSet, get_recipe_queryset,
+                    get_subscription_queryset)
+from recipes.models import Ingredient, Tag
+
+
+def run_in_pool(func):
+    """
+    Выполняет синхронную работу с ORM в пуле потоков, не занимая
+    цикл событий. Соединение потока закрывается после вызова,
+    как при CONN_MAX_AGE=0.
+    """
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+def make_request(request):
+    return Request(request, authenticators=[
+        auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+
+
+def check_throttles(request, view_class, action):
+    """Те же ограничители, что и у синхронного представления."""
+    view = view_class(action=action)
+    waits = [
+        throttle.wait() for throttle in (
+            throttle_class()
+            for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES
+        ) if not throttle.allow_request(request, view)
+    ]
+    if waits:
+        raise exceptions.Throttled(max(waits))
+
+
+def filter_queryset(filterset_class, request, queryset):
+    filterset = filterset_class(
+        request.query_params, queryset=queryset, request=request
+    )
+    if not filterset.is_valid():
+        raise exceptions.ValidationError(filterset.errors)
+    return filterset.qs
+
+
+def paginate(request, queryset, serializer_class):
+    paginator = CustomPageNumberPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(
+        page, many=True, context={'request': request}
+    )
+    return paginator.get_paginated_response(serializer.data).data
+
+
+@run_in_pool
+def get_recipe_list(request):
+    request = make_request(request)
+    check_throttles(request, RecipeViewSet, 'list')
+    queryset = filter_queryset(
+        RecipeFilter, request, get_recipe_queryset(request)
+    )
+    return paginate(request, queryset, RecipeReadSerializer)
+
+
+@run_in_pool
+def get_recipe_detail(request, pk):
+    request = make_request(request)
+    check_throttles(request, RecipeViewSet, 'retrieve')
+    recipe = get_object_or_404(get_recipe_queryset(request), pk=pk)
+    return RecipeReadSerializer(recipe, context={'request': request}).data
+
+
+@run_in_pool
+def get_tag_list(request):
+    check_throttles(make_request(request), TagViewSet, 'list')
+    return TagSerializer(Tag.objects.all(), many=True).data
+
+
+@run_in_pool
+def get_ingredient_list(request):
+    request = make_request(request)
+    check_throttles(request, IngredientViewSet, 'list')
+    queryset = filter_queryset(
+        IngredientFilter, request, Ingredient.objects.all()
+    )
+    return IngredientSerializer(queryset, many=True).data
+
+
+@run_in_pool
+def get_subscription_list(request):
+    request = make_request(request)
+    if not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    check_throttles(request, CustomUserViewSet, 'subscriptions')
+    return paginate(
+        request, get_subscription_queryset(request.user),
+        SubscriptionSerializer
+    )
+
+
+def json_response(data, status=200, headers=None):
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False}, headers=headers
+    )
+
+
+async def respond(getter, request, *args):
+    if request.method not in ('GET', 'HEAD'):
+        return json_response(
+            {'detail': f'Метод "{request.method}" не разрешен.'}, status=405
+        )
+    try:
+        data = await getter(request, *args)
+    except Http404:
+        return json_response({'detail': 'Страница не найдена.'}, status=404)
+    except exceptions.APIException as exc:
+        detail = exc.detail
+        if not isinstance(detail, (dict, list)):
+            detail = {'detail': detail}
+        headers = None
+        if getattr(exc, 'wait', None) is not None:
+            headers = {'Retry-After': str(math.ceil(exc.wait))}
+        return json_response(detail, status=exc.status_code, headers=headers)
+    return json_response(data)
+
+
+async def recipe_list(request):
+    """GET: api/async/recipes/"""
+    return await respond(get_recipe_list, request)
+
+
+async def recipe_detail(request, pk):
+    """GET: api/async/recipes/{id}/"""
+    return await respond(get_recipe_detail, request, pk)
+
+
+async def tag_list(request):
+    """GET: api/async/tags/"""
+    return await respond(get_tag_list, request)
+
+
+async def ingredient_list(request):
+    """GET: api/async/ingredients/"""
+    return await respond(get_ingredient_list, request)
+
+
+async def subscription_list(request):
+    """GET: api/async/users/subscriptions/"""
+    return await respond(get_subscription_list, request)
@@ -0,0 +1,50 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_CACHE_PREFIX = 'auth-token'
+
+
+def get_token_cache_key(key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'{TOKEN_CACHE_PREFIX}:{digest}'
+
+
+def drop_cache_keys(cache_keys):
+    """
+    Удаляет записи сразу и после фиксации: пара, закэшированная
+    конкурентной аутентификацией до фиксации, не переживет ее.
+    """
+    cache.delete_many(cache_keys)
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def invalidate_token(key):
+    drop_cache_keys([get_token_cache_key(key)])
+
+
+def invalidate_user_tokens(user):
+    """Сбрасывает кэш всех токенов пользователя."""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    drop_cache_keys([get_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием пары (user, token).
+    Запись живет AUTH_TOKEN_CACHE_TIMEOUT секунд и сбрасывается
+    при выходе, смене пароля, роли или деактивации пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        credentials = cache.get(cache_key)
+        if credentials is not None:
+            return credentials
+        credentials = super().authenticate_credentials(key)
+        cache.set(cache_key, credentials, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return credentials
@@ -0,0 +1,43 @@
+from .documents import render_documents
+from recipes.models import Change
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+
+def compact_changes(changes):
+    """Оставляет по одному, последнему, изменению на объект."""
+    latest = {}
+    for change in changes:
+        latest.pop((change.kind, change.object_id), None)
+        latest[(change.kind, change.object_id)] = change
+    return list(latest.values())
+
+
+def serialize_changes(changes, request):
+    """
+    Рецепты передаются целиком, остальные объекты - только id.
+    Рецепт, удаленный после записи об изменении, отдается удалением.
+    """
+    changes = compact_changes(changes)
+    recipes = {
+        recipe['id']: recipe for recipe in render_documents([
+            change.object_id for change in changes
+            if change.kind == Change.RECIPE and not change.deleted
+        ], request)
+    }
+    results = []
+    for change in changes:
+        item = {
+            'seq': change.sequence,
+            'type': change.kind,
+            'id': change.object_id,
+            'op': DELETE if change.deleted else UPSERT,
+        }
+        if change.kind == Change.RECIPE and not change.deleted:
+            if change.object_id in recipes:
+                item['data'] = recipes[change.object_id]
+            else:
+                item['op'] = DELETE
+        results.append(item)
+    return results
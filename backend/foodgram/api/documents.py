@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .serializers import RecipeDocumentSerializer, RecipeReadSerializer
+from recipes.membership import FAVORITE, SHOPPING_CART, get_recipe_ids
+from recipes.models import (Recipe, RecipeDocument, RecipeIngredientAmount,
+                            Subscription)
+
+BATCH_SIZE = 500
+
+
+def get_document_queryset():
+    return Recipe.objects.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'recipe',
+            queryset=RecipeIngredientAmount.objects.select_related(
+                'ingredient'
+            )
+        )
+    )
+
+
+def build_documents(recipes):
+    # Без request в контексте изображение хранится относительной ссылкой.
+    return [
+        RecipeDocument(
+            recipe_id=recipe.id, data=RecipeDocumentSerializer(recipe).data
+        )
+        for recipe in recipes
+    ]
+
+
+def rebuild_documents(recipe_ids):
+    """
+    Пересобирает документы рецептов. Вызывается внутри транзакции
+    изменения, так что документ и исходные данные фиксируются вместе.
+    """
+    recipe_ids = list(recipe_ids)
+    with transaction.atomic():
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            batch = recipe_ids[start:start + BATCH_SIZE]
+            RecipeDocument.objects.filter(recipe_id__in=batch).delete()
+            RecipeDocument.objects.bulk_create(build_documents(
+                get_document_queryset().filter(id__in=batch)
+            ))
+
+
+def rebuild_all_documents():
+    """Полная пересборка: каждая пачка рецептов в своей транзакции."""
+    recipe_ids = list(Recipe.objects.order_by('id').values_list(
+        'id', flat=True
+    ))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        rebuild_documents(recipe_ids[start:start + BATCH_SIZE])
+    return len(recipe_ids)
+
+
+def get_documents(recipe_ids):
+    """
+    Документы видимых рецептов по id; недостающие собираются
+    и сохраняются.
+    """
+    documents = dict(RecipeDocument.objects.filter(
+        recipe_id__in=recipe_ids, recipe__deleted_at__isnull=True
+    ).values_list('recipe_id', 'data'))
+    missing = [pk for pk in recipe_ids if pk not in documents]
+    if missing:
+        built = build_documents(get_document_queryset().filter(id__in=missing))
+        RecipeDocument.objects.bulk_create(built, ignore_conflicts=True)
+        documents.update((document.recipe_id, document.data)
+                         for document in built)
+    return documents
+
+
+def get_subscribed_ids(user, author_ids):
+    if not user.is_authenticated:
+        return frozenset()
+    return frozenset(Subscription.objects.filter(
+        user=user, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+
+
+def render_documents(recipe_ids, request):
+    """
+    Ответ в формате RecipeReadSerializer: документы рецептов в
+    порядке recipe_ids с наложенными полями текущего пользователя.
+    """
+    documents = get_documents(recipe_ids)
+    user = request.user
+    favorites, cart = frozenset(), frozenset()
+    if user.is_authenticated:
+        favorites = get_recipe_ids(FAVORITE, user.id)
+        cart = get_recipe_ids(SHOPPING_CART, user.id)
+    subscribed = get_subscribed_ids(user, {
+        document['author']['id'] for document in documents.values()
+    })
+    results = []
+    for pk in recipe_ids:
+        document = documents.get(pk)
+        if document is None:
+            continue
+        author = document['author']
+        image = document['image']
+        overlay = {
+            'author': {**author, 'is_subscribed': author['id'] in subscribed},
+            'is_favorited': pk in favorites,
+            'is_in_shopping_cart': pk in cart,
+            'image': image and request.build_absolute_uri(image),
+        }
+        results.append({
+            name: overlay[name] if name in overlay else document[name]
+            for name in RecipeReadSerializer.Meta.fields
+        })
+    return results
@@ -1,14 +1,28 @@
 from django_filters import FilterSet
 from django_filters.filters import (CharFilter, ChoiceFilter,
-                                    ModelMultipleChoiceFilter, NumberFilter)
+                                    ModelMultipleChoiceFilter,
+                                    MultipleChoiceFilter, NumberFilter)
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.membership import FAVORITE, SHOPPING_CART, get_recipe_ids
+from recipes.models import Ingredient, Recipe, RecipeIngredientAmount
+from recipes.tag_slugs import get_tag_choices, tag_slug_map
 
 RECIPE_CHOICES = (
     (0, 'Not_In_List'),
     (1, 'In_List'),
 )
 
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+
+
+def get_ingredient_recipe_ids(ingredient_ids):
+    return RecipeIngredientAmount.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values('recipe_id')
+
 
 class IngredientFilter(FilterSet):
     name = CharFilter(field_name='name', lookup_expr='istartswith')
@@ -20,10 +34,23 @@ class IngredientFilter(FilterSet):
 
 class RecipeFilter(FilterSet):
     author = NumberFilter(field_name='author__id', lookup_expr='exact')
-    tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
+    tags = MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='get_tags'
+    )
+    cooking_time_min = NumberFilter(
+        field_name='cooking_time', lookup_expr='gte'
+    )
+    cooking_time_max = NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
+    )
+    ingredients = ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='get_ingredients'
+    )
+    exclude_ingredients = ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='get_exclude_ingredients'
     )
     is_in_shopping_cart = ChoiceFilter(
         choices=RECIPE_CHOICES,
@@ -33,6 +60,41 @@ class RecipeFilter(FilterSet):
         choices=RECIPE_CHOICES,
         method='get_is_in'
     )
+    ordering = ChoiceFilter(
+        choices=tuple((key, key) for key in RECIPE_ORDERINGS),
+        method='get_ordering'
+    )
+
+    def get_tags(self, queryset, name, value):
+        """
+        Рецепты хотя бы с одним из тегов. Подзапрос id__in вместо JOIN
+        не размножает рецепты с несколькими подходящими тегами и читает
+        только индекс recipe_tags_tag_recipe_idx.
+        """
+        if not value:
+            return queryset
+        return queryset.filter(id__in=Recipe.tags.through.objects.filter(
+            tag_id__in=tag_slug_map.get_ids(value)
+        ).values('recipe_id'))
+
+    def get_ingredients(self, queryset, name, value):
+        """
+        Рецепты, в которых есть все указанные ингредиенты. Подзапрос
+        по ингредиенту читает только индекс ingredient_recipe_idx.
+        """
+        for ingredient in value:
+            queryset = queryset.filter(id__in=get_ingredient_recipe_ids(
+                [ingredient.id]
+            ))
+        return queryset
+
+    def get_exclude_ingredients(self, queryset, name, value):
+        """Рецепты без единого из указанных ингредиентов."""
+        if not value:
+            return queryset
+        return queryset.exclude(id__in=get_ingredient_recipe_ids(
+            [ingredient.id for ingredient in value]
+        ))
 
     def get_is_in(self, queryset, name, value):
         user = self.request.user
@@ -40,12 +102,20 @@ class RecipeFilter(FilterSet):
             return queryset
         if value in ('1', 'true',):
             if name == 'is_favorited':
-                queryset = queryset.filter(favorite_recipes__user=user)
+                queryset = queryset.filter(
+                    id__in=get_recipe_ids(FAVORITE, user.id)
+                )
             if name == 'is_in_shopping_cart':
-                queryset = queryset.filter(shopping_cart__user=user)
+                queryset = queryset.filter(
+                    id__in=get_recipe_ids(SHOPPING_CART, user.id)
+                )
         return queryset
 
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'author',
-                  'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'cooking_time_min', 'cooking_time_max',
+                  'ingredients', 'exclude_ingredients',
+                  'is_favorited', 'is_in_shopping_cart', 'ordering')
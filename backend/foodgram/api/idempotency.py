@@ -0,0 +1,93 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from recipes.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+KEY_MAX_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def get_fingerprint(request):
+    """Отпечаток метода, пути и тела запроса."""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256('\n'.join((
+        request.method, request.path, body
+    )).encode()).hexdigest()
+
+
+def get_expiry():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def replay(record):
+    return Response(record.response, status=record.status_code,
+                    headers={REPLAYED_HEADER: 'true'})
+
+
+def idempotent(method):
+    """
+    Поддержка Idempotency-Key для методов представления.
+    Ключ вставляется в одной транзакции с самой операцией, поэтому
+    параллельный дубль ждет на уникальном индексе и затем получает
+    сохраненный ответ; повтор в пределах IDEMPOTENCY_KEY_TTL отвечает
+    без валидации и записи. Если операция завершилась исключением или
+    ответом 5xx, ключ откатывается и запрос можно повторить.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return method(self, request, *args, **kwargs)
+        if len(key) > KEY_MAX_LENGTH:
+            raise ValidationError({IDEMPOTENCY_HEADER: (
+                f'Не более {KEY_MAX_LENGTH} символов.'
+            )})
+        fingerprint = get_fingerprint(request)
+        with transaction.atomic():
+            record, created = (
+                IdempotencyKey.objects.select_for_update().get_or_create(
+                    user=request.user, key=key,
+                    defaults={'fingerprint': fingerprint}
+                )
+            )
+            if not created and record.created >= get_expiry():
+                if record.fingerprint != fingerprint:
+                    return Response(
+                        {'detail': 'Ключ уже использован с другим запросом.'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+                if record.status_code is None:
+                    return Response(
+                        {'detail': 'Запрос с этим ключом еще выполняется.'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                return replay(record)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+            record.fingerprint = fingerprint
+            record.status_code = response.status_code
+            record.response = response.data
+            record.created = timezone.now()
+            record.save()
+        return response
+    return wrapper
+
+
+def prune_idempotency_keys():
+    """Удаляет ключи старше IDEMPOTENCY_KEY_TTL."""
+    deleted, _ = IdempotencyKey.objects.filter(
+        created__lt=get_expiry()
+    ).delete()
+    return deleted
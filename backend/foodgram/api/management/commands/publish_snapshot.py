@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.snapshot import publish_changes, publish_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Публикует статический снимок каталога рецептов для nginx.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Обновить только изменившиеся с прошлой публикации файлы.'
+        )
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            total = publish_changes()
+            message = f'Обновлено рецептов: {total}'
+        else:
+            total = publish_snapshot()
+            message = f'Опубликовано рецептов: {total}'
+        self.stdout.write(self.style.SUCCESS(message))
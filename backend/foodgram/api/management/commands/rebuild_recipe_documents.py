@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.documents import rebuild_all_documents
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает документы рецептов для чтения.'
+
+    def handle(self, *args, **options):
+        total = rebuild_all_documents()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано документов: {total}'
+        ))
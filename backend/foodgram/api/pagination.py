@@ -1,6 +1,77 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_query_param = 'page'
     page_size_query_param = 'limit'
+
+
+class FeedKeysetPagination(BasePagination):
+    """
+    Пагинация ленты по ключу (pub_date, id): курсор указывает
+    на последний рецепт предыдущей страницы.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return min(max(limit, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, pk = base64.urlsafe_b64decode(
+                encoded.encode()
+            ).decode().rsplit('|', 1)
+            cursor = parse_datetime(pub_date), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, entry):
+        pub_date, pk = entry
+        return base64.urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{pk}'.encode()
+        ).decode()
+
+    def paginate_entries(self, entries, limit, request):
+        """Отрезает лишнюю запись, по которой определяется next."""
+        self.request = request
+        self.next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            self.next_cursor = self.encode_cursor(entries[-1])
+        return entries
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
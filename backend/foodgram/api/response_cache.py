@@ -0,0 +1,81 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from foodgram.compression import compress, is_compressible
+from foodgram.middleware import HybridMiddleware
+from recipes.ingredient_index import new_version
+
+CACHE_PREFIX = 'response'
+VERSION_KEY = 'response-cache-version'
+
+
+def invalidate_responses():
+    cache.set(VERSION_KEY, new_version(), None)
+
+
+def is_cacheable_request(request):
+    """Кэшируются только анонимные GET-запросы к каталогам и рецептам."""
+    return (
+        request.method == 'GET'
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and request.path.startswith(settings.RESPONSE_CACHE_PREFIXES)
+    )
+
+
+def get_cache_key(request):
+    version = cache.get_or_set(VERSION_KEY, new_version, None)
+    digest = hashlib.sha256('\n'.join((
+        request.get_host(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    )).encode()).hexdigest()
+    return f'{CACHE_PREFIX}:{version}:{digest}'
+
+
+def restore_response(entry):
+    content, gzip_content, content_type, vary = entry
+    response = HttpResponse(content, content_type=content_type)
+    if vary:
+        response['Vary'] = vary
+    response.gzip_content = gzip_content
+    return response
+
+
+class ResponseCacheMiddleware(HybridMiddleware):
+    """
+    Кэширует ответы анонимным клиентам вместе со сжатым вариантом,
+    чтобы горячие ответы сжимались один раз, а не на каждый запрос.
+    Записи сбрасываются повышением версии при изменении данных.
+    """
+
+    def process_request(self, request):
+        if not is_cacheable_request(request):
+            return None
+        request.response_cache_key = get_cache_key(request)
+        entry = cache.get(request.response_cache_key)
+        if entry is not None:
+            request.response_cache_hit = True
+            return restore_response(entry)
+        return None
+
+    def process_response(self, request, response):
+        cache_key = getattr(request, 'response_cache_key', None)
+        if (cache_key is None or getattr(request, 'response_cache_hit', False)
+                or response.status_code != 200 or response.streaming
+                or response.cookies):
+            return response
+        response.gzip_content = None
+        if is_compressible(response):
+            compressed = compress(response.content)
+            if len(compressed) < len(response.content):
+                response.gzip_content = compressed
+        cache.set(cache_key, (
+            response.content,
+            response.gzip_content,
+            response['Content-Type'],
+            response.get('Vary'),
+        ), settings.RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -1,19 +1,88 @@
+from collections import OrderedDict
+
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from django.shortcuts import get_object_or_404
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 
+from recipes.membership import FAVORITE, SHOPPING_CART, get_recipe_ids
 from recipes.models import (Ingredient, Recipe, RecipeIngredientAmount,
                             Subscription, Tag)
+from recipes.storage import get_content_hash, get_hash_from_name
 from users.models import CustomUser
 
 
+def is_sideload(request):
+    return request is not None and request.query_params.get(
+        'sideload'
+    ) in ('1', 'true')
+
+
+def get_sparse_params(request):
+    """
+    Разбирает ?fields= и ?expand= в множества имен.
+    None означает, что параметр не передан. В режиме ?sideload=1
+    вложенные объекты по умолчанию свернуты до id.
+    """
+    if request is None:
+        return None, None
+
+    def parse(name):
+        value = request.query_params.get(name)
+        if value is None:
+            return None
+        return {item.strip() for item in value.split(',') if item.strip()}
+
+    expand = parse('expand')
+    if expand is None and is_sideload(request):
+        expand = set()
+    return parse('fields'), expand
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= оставляет только перечисленные поля верхнего уровня.
+    Если передан fields или expand, вложенные объекты из
+    collapsed_fields отдаются как id, пока не указаны в expand.
+    """
+    collapsed_fields = {}
+
+    def is_top_level(self):
+        return self.parent is None or (
+            isinstance(self.parent, serializers.ListSerializer)
+            and self.parent.parent is None
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_top_level() or self.context.get('included'):
+            return fields
+        requested, expand = get_sparse_params(self.context.get('request'))
+        if requested is not None:
+            fields = OrderedDict(
+                (name, field) for name, field in fields.items()
+                if name in requested
+            )
+        if requested is not None or expand is not None:
+            for name, collapsed in self.collapsed_fields.items():
+                if name in fields and name not in (expand or ()):
+                    fields[name] = collapsed()
+        return fields
+
+
 class IsSubscribedMixin:
 
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
         if user.is_authenticated:
             if isinstance(obj, CustomUser):
+                # Аннотация из CustomUserViewSet.get_queryset.
+                is_subscribed = getattr(obj, 'is_subscribed', None)
+                if is_subscribed is not None:
+                    return is_subscribed
+                if obj.pk == user.pk:
+                    return False
                 return user.sub_user.filter(author=obj).exists()
             return True
         return False
@@ -56,7 +125,8 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class CustomUserReadSerializer(serializers.ModelSerializer,
+class CustomUserReadSerializer(SparseFieldsMixin,
+                               serializers.ModelSerializer,
                                IsSubscribedMixin):
     is_subscribed = serializers.SerializerMethodField(
         read_only=True
@@ -103,7 +173,8 @@ class CustomUserSetPasswordSerializer(serializers.Serializer):
         return validate_data
 
 
-class SubscriptionSerializer(serializers.ModelSerializer,
+class SubscriptionSerializer(SparseFieldsMixin,
+                             serializers.ModelSerializer,
                              IsSubscribedMixin):
     id = serializers.IntegerField(source='author.id')
     email = serializers.EmailField(source='author.email')
@@ -116,21 +187,42 @@ class SubscriptionSerializer(serializers.ModelSerializer,
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
 
+    collapsed_fields = {
+        'recipes': lambda: serializers.SerializerMethodField(
+            method_name='get_recipe_ids'
+        ),
+    }
+
     class Meta:
         model = CustomUser
         fields = (
             'email', 'id', 'username', 'first_name', 'last_name',
             'is_subscribed', 'recipes', 'recipes_count')
 
-    def get_recipes(self, obj):
-        return self.get_recipes_template(
-            obj.author.recipes.only(
+    def get_author_recipes(self, obj):
+        # Рецепты, загруженные prefetch в CustomUserViewSet.subscriptions.
+        recipes = getattr(obj.author, 'visible_recipes', None)
+        if recipes is None:
+            recipes = obj.author.recipes.only(
                 'id', 'name', 'image', 'cooking_time'
             )
-        )
+        return recipes
+
+    def get_recipes(self, obj):
+        return self.get_recipes_template(self.get_author_recipes(obj))
+
+    def get_recipe_ids(self, obj):
+        recipes = self.get_author_recipes(obj)
+        limit = self.context.get('request').query_params.get('recipes_limit')
+        if limit:
+            recipes = recipes[:int(limit)]
+        return [recipe.id for recipe in recipes]
 
     def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
+        recipes = getattr(obj.author, 'visible_recipes', None)
+        if recipes is None:
+            return obj.author.recipes.count()
+        return len(recipes)
 
 
 class SubscribeSerializer(serializers.ModelSerializer,
@@ -176,6 +268,14 @@ class RecipeIngredientAmountSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeIngredientIdSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient_id')
+
+    class Meta:
+        model = RecipeIngredientAmount
+        fields = ('id', 'amount')
+
+
 class IngredientAmountSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField()
     amount = serializers.IntegerField()
@@ -192,7 +292,7 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         return value
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = CustomUserReadSerializer(
         read_only=True,
         default=serializers.CurrentUserDefault()
@@ -205,6 +305,16 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
+    collapsed_fields = {
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            many=True, read_only=True
+        ),
+        'ingredients': lambda: RecipeIngredientIdSerializer(
+            many=True, source='recipe', read_only=True
+        ),
+    }
+
     class Meta:
         model = Recipe
         fields = (
@@ -212,17 +322,41 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
         )
 
-    def get_is_favorited(self, obj):
+    def get_recipe_ids(self, kind):
+        # Контекст общий для всех элементов списка, поэтому
+        # множество загружается один раз на запрос.
         user = self.context.get('request').user
-        if user.is_authenticated:
-            return user.favorite_recipes.filter(recipe=obj).exists()
-        return False
+        if not user.is_authenticated:
+            return frozenset()
+        key = f'{kind}_ids'
+        if key not in self.context:
+            self.context[key] = get_recipe_ids(kind, user.id)
+        return self.context[key]
+
+    def get_is_favorited(self, obj):
+        return obj.id in self.get_recipe_ids(FAVORITE)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return user.shopping_cart.filter(recipe=obj).exists()
-        return False
+        return obj.id in self.get_recipe_ids(SHOPPING_CART)
+
+
+class AuthorDocumentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+class RecipeDocumentSerializer(RecipeReadSerializer):
+    """Представление рецепта для RecipeDocument без полей пользователя."""
+    author = AuthorDocumentSerializer(read_only=True)
+    is_favorited = None
+    is_in_shopping_cart = None
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = tuple(
+            name for name in RecipeReadSerializer.Meta.fields
+            if name not in ('is_favorited', 'is_in_shopping_cart')
+        )
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer,
@@ -292,6 +426,11 @@ class RecipeWriteSerializer(serializers.ModelSerializer,
         return recipe
 
     def update(self, instance, validated_data):
+        image = validated_data.get('image')
+        if image and instance.image and (
+            get_content_hash(image) == get_hash_from_name(instance.image.name)
+        ):
+            validated_data.pop('image')
         if 'ingredients' in validated_data:
             ingredients = validated_data.pop('ingredients')
             instance.ingredients.clear()
@@ -319,3 +458,14 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = 'id', 'name', 'image', 'cooking_time'
+
+
+class BatchIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_IDS
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,64 @@
+from collections.abc import Mapping
+
+from .serializers import (CustomUserReadSerializer, IngredientSerializer,
+                          ShortRecipeSerializer, TagSerializer)
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+
+def index_by_id(data):
+    return {item['id']: item for item in data}
+
+
+def collect_ids(items, name):
+    """
+    id связанных объектов поля name. Свернутое поле хранит id,
+    развернутое (?expand=) или ингредиент - словарь с ключом id.
+    """
+    ids = set()
+    for item in items:
+        value = item.get(name)
+        if value is None:
+            continue
+        if not isinstance(value, list):
+            value = [value]
+        ids.update(
+            entry['id'] if isinstance(entry, Mapping) else entry
+            for entry in value
+        )
+    return ids
+
+
+def get_recipe_included(data, request, annotate_users):
+    """
+    Справочник для режима ?sideload=1: каждый тег, автор и
+    ингредиент страницы попадает в ответ один раз.
+    """
+    authors = annotate_users(
+        CustomUser.objects.filter(id__in=collect_ids(data, 'author'))
+    )
+    tags = Tag.objects.filter(id__in=collect_ids(data, 'tags'))
+    ingredients = Ingredient.objects.filter(
+        id__in=collect_ids(data, 'ingredients')
+    )
+    return {
+        'authors': index_by_id(CustomUserReadSerializer(
+            authors, many=True,
+            context={'request': request, 'included': True}
+        ).data),
+        'tags': index_by_id(TagSerializer(tags, many=True).data),
+        'ingredients': index_by_id(
+            IngredientSerializer(ingredients, many=True).data
+        ),
+    }
+
+
+def get_subscription_included(data, request):
+    recipes = Recipe.objects.filter(
+        id__in=collect_ids(data, 'recipes')
+    ).only('id', 'name', 'image', 'cooking_time')
+    return {
+        'recipes': index_by_id(ShortRecipeSerializer(
+            recipes, many=True, context={'request': request}
+        ).data),
+    }
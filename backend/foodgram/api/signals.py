@@ -0,0 +1,115 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .documents import rebuild_documents
+from .response_cache import invalidate_responses
+from recipes.changes import log_recipe_changes
+from recipes.models import (Ingredient, Recipe, RecipeDocument,
+                            RecipeIngredientAmount, Tag)
+from users.models import CustomUser
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+# Поля пользователя, от которых зависят документы и ответы с его
+# рецептами: данные автора и скрытие.
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'email',
+                 'deleted_at')
+
+
+@receiver(pre_save, sender=CustomUser)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    instance.author_changed = False
+    fields = [
+        name for name in AUTHOR_FIELDS
+        if update_fields is None or name in update_fields
+    ]
+    if instance.pk is None or not fields:
+        return
+    stored = CustomUser.objects.filter(pk=instance.pk).values(*fields).first()
+    instance.author_changed = stored is not None and any(
+        stored[name] != getattr(instance, name) for name in fields
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    invalidate_user_tokens(instance)
+    if not getattr(instance, 'author_changed', False):
+        return
+    invalidate_responses()
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    rebuild_documents(recipe_ids)
+    log_recipe_changes(recipe_ids)
+
+
+# Избранное влияет только на сортировку popular/trending, ее
+# устаревание ограничено RESPONSE_CACHE_TIMEOUT.
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredientAmount)
+@receiver(post_delete, sender=RecipeIngredientAmount)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    invalidate_responses()
+
+
+def get_related_recipe_ids(instance):
+    return list(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def catalog_item_saved(sender, instance, created, **kwargs):
+    if not created:
+        recipe_ids = get_related_recipe_ids(instance)
+        rebuild_documents(recipe_ids)
+        log_recipe_changes(recipe_ids)
+
+
+# После удаления связи с рецептами уже не найти, поэтому
+# рецепты запоминаются до удаления.
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def catalog_item_deleting(sender, instance, **kwargs):
+    instance.document_recipe_ids = get_related_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def catalog_item_deleted(sender, instance, **kwargs):
+    recipe_ids = getattr(instance, 'document_recipe_ids', ())
+    rebuild_documents(recipe_ids)
+    log_recipe_changes(recipe_ids)
+
+
+# Правки рецепта вне API (админка, shell) сбрасывают документ, и он
+# собирается заново при чтении. API пересобирает его сам в конце
+# транзакции записи.
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredientAmount)
+@receiver(post_delete, sender=RecipeIngredientAmount)
+def recipe_document_stale(sender, instance, **kwargs):
+    recipe_id = instance.pk if sender is Recipe else instance.recipe_id
+    RecipeDocument.objects.filter(recipe_id=recipe_id).delete()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_document_stale(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if not action.startswith('post_'):
+        return
+    recipe_ids = (pk_set or ()) if reverse else (instance.pk,)
+    RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
@@ -0,0 +1,255 @@
+import os
+import shutil
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .documents import rebuild_documents, render_documents
+from .serializers import IngredientSerializer, TagSerializer
+from foodgram.compression import compress
+from recipes.changes import get_sequence, is_history_pruned, sequence_changes
+from recipes.models import Change, Ingredient, Recipe, Tag
+
+CURRENT = 'current'
+RELEASES = 'releases'
+PUBLISHED_FILE = '.published'
+RECIPES_DIR = 'recipes'
+PAGE_FILE = 'page-{}.json'
+DETAIL_FILE = '{}.json'
+
+
+class SnapshotRequest:
+    """
+    Анонимный запрос для render_documents: ссылки на изображения
+    строятся от SNAPSHOT_BASE_URL.
+    """
+    user = AnonymousUser()
+
+    def build_absolute_uri(self, location):
+        return urljoin(settings.SNAPSHOT_BASE_URL, location)
+
+
+def write_file(path, content):
+    """
+    Пишет файл и его .gz-вариант для gzip_static через временный
+    файл и os.replace, так что читатель видит либо старую, либо новую
+    версию целиком.
+    """
+    variants = {path: content, path + '.gz': None}
+    if len(content) >= settings.COMPRESS_MIN_SIZE:
+        compressed = compress(content)
+        if len(compressed) < len(content):
+            variants[path + '.gz'] = compressed
+    for name, data in variants.items():
+        if data is None:
+            if os.path.exists(name):
+                os.remove(name)
+            continue
+        tmp = name + '.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(data)
+        os.replace(tmp, name)
+
+
+def write_json(path, data):
+    write_file(path, JSONRenderer().render(data))
+
+
+def remove_file(path):
+    for name in (path, path + '.gz'):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def get_page_url(page):
+    if page is None:
+        return None
+    return urljoin(
+        settings.SNAPSHOT_BASE_URL,
+        f'/api/recipes/?limit={settings.REST_FRAMEWORK["PAGE_SIZE"]}'
+        f'&page={page}'
+    )
+
+
+def write_recipe_pages(root, request):
+    """Страницы списка рецептов анонимного пользователя без фильтров."""
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    pages = max(1, -(-len(recipe_ids) // page_size))
+    for page in range(1, pages + 1):
+        page_ids = recipe_ids[(page - 1) * page_size:page * page_size]
+        write_json(os.path.join(root, RECIPES_DIR, PAGE_FILE.format(page)), {
+            'count': len(recipe_ids),
+            'next': get_page_url(page + 1 if page < pages else None),
+            'previous': get_page_url(page - 1 if page > 1 else None),
+            'results': render_documents(page_ids, request),
+        })
+    directory = os.path.join(root, RECIPES_DIR)
+    for name in os.listdir(directory):
+        if name.startswith('page-') and name.endswith('.json'):
+            if int(name[len('page-'):-len('.json')]) > pages:
+                remove_file(os.path.join(directory, name))
+
+
+def write_recipe_details(root, request, recipe_ids):
+    for result in render_documents(list(recipe_ids), request):
+        write_json(
+            os.path.join(root, RECIPES_DIR, DETAIL_FILE.format(result['id'])),
+            result
+        )
+
+
+def write_catalogs(root):
+    write_json(os.path.join(root, 'tags.json'),
+               TagSerializer(Tag.objects.all(), many=True).data)
+    write_json(os.path.join(root, 'ingredients.json'),
+               IngredientSerializer(Ingredient.objects.all(), many=True).data)
+
+
+def get_published_sequence():
+    """
+    Номер журнала изменений, до которого включительно выпуск учтет
+    изменения. Берется до чтения данных: изменение, зафиксированное
+    во время публикации, получит больший номер и попадет в следующую.
+    """
+    sequence_changes()
+    return get_sequence().last
+
+
+def write_published(root, sequence):
+    write_file(os.path.join(root, PUBLISHED_FILE), str(sequence).encode())
+
+
+def read_published(root):
+    """Номер журнала выпуска; None, если его нет или он в старом формате."""
+    path = os.path.join(root, PUBLISHED_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        content = file.read()
+    return int(content) if content.isdigit() else None
+
+
+def swap_current(snapshot_root, release):
+    """Атомарно переключает симлинк current на новый выпуск."""
+    link = os.path.join(snapshot_root, CURRENT)
+    tmp = link + '.tmp'
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(os.path.join(RELEASES, release), tmp)
+    os.replace(tmp, link)
+
+
+def remove_old_releases(snapshot_root):
+    releases_root = os.path.join(snapshot_root, RELEASES)
+    current = os.path.basename(
+        os.path.realpath(os.path.join(snapshot_root, CURRENT))
+    )
+    old = [name for name in sorted(os.listdir(releases_root))
+           if name != current]
+    for name in old[:max(0, len(old) - settings.SNAPSHOT_KEEP_RELEASES)]:
+        shutil.rmtree(os.path.join(releases_root, name))
+
+
+def create_release(snapshot_root):
+    release = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    return release, os.path.join(snapshot_root, RELEASES, release)
+
+
+def link_release(source, target):
+    """
+    Копирует выпуск жесткими ссылками. write_file заменяет файл, а не
+    пишет в него, поэтому правка копии не затрагивает исходный выпуск.
+    """
+    for directory, _, names in os.walk(source):
+        destination = os.path.join(target, os.path.relpath(directory, source))
+        os.makedirs(destination, exist_ok=True)
+        for name in names:
+            if not name.endswith('.tmp'):
+                os.link(os.path.join(directory, name),
+                        os.path.join(destination, name))
+
+
+def build_missing_documents():
+    """
+    Собирает недостающие документы и возвращает id их рецептов.
+    Документ сбрасывается и правками вне API, которые не попадают
+    в журнал, поэтому такие рецепты тоже публикуются заново.
+    """
+    recipe_ids = list(Recipe.objects.filter(
+        document__isnull=True
+    ).values_list('id', flat=True))
+    rebuild_documents(recipe_ids)
+    return set(recipe_ids)
+
+
+def get_changed_recipe_ids(since, until):
+    return set(Change.objects.filter(
+        kind=Change.RECIPE, sequence__gt=since, sequence__lte=until
+    ).values_list('object_id', flat=True))
+
+
+def publish_snapshot(snapshot_root=None):
+    """
+    Полная публикация: снимок собирается в новом каталоге выпуска
+    и становится текущим одной заменой симлинка.
+    """
+    snapshot_root = snapshot_root or settings.SNAPSHOT_ROOT
+    published = get_published_sequence()
+    build_missing_documents()
+    release, root = create_release(snapshot_root)
+    os.makedirs(os.path.join(root, RECIPES_DIR))
+    request = SnapshotRequest()
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    write_recipe_details(root, request, recipe_ids)
+    write_recipe_pages(root, request)
+    write_catalogs(root)
+    write_published(root, published)
+    swap_current(snapshot_root, release)
+    remove_old_releases(snapshot_root)
+    return len(recipe_ids)
+
+
+def publish_changes(snapshot_root=None):
+    """
+    Инкрементальная публикация. Новый выпуск собирается из жестких
+    ссылок на файлы текущего, в нем переписываются только изменения,
+    и он становится текущим заменой симлинка: читатель не увидит
+    смеси старых и новых страниц. Измененные рецепты берутся из
+    журнала изменений по номерам после номера прошлой публикации:
+    номер выдается после фиксации, так что запись, зафиксированная
+    позже, не будет пропущена. Без текущего выпуска или если журнал
+    уже очищен после его номера выполняется полная публикация.
+    """
+    snapshot_root = snapshot_root or settings.SNAPSHOT_ROOT
+    current = os.path.realpath(os.path.join(snapshot_root, CURRENT))
+    since = read_published(current)
+    if since is None or is_history_pruned(since):
+        return publish_snapshot(snapshot_root)
+    published = get_published_sequence()
+    changed = build_missing_documents() | get_changed_recipe_ids(
+        since, published
+    )
+    recipe_ids = set(Recipe.objects.values_list('id', flat=True))
+    changed &= recipe_ids
+    release, root = create_release(snapshot_root)
+    link_release(current, root)
+    directory = os.path.join(root, RECIPES_DIR)
+    deleted = {
+        int(name[:-len('.json')]) for name in os.listdir(directory)
+        if name.endswith('.json') and name[:-len('.json')].isdigit()
+    } - recipe_ids
+    request = SnapshotRequest()
+    for recipe_id in deleted:
+        remove_file(os.path.join(directory, DETAIL_FILE.format(recipe_id)))
+    write_recipe_details(root, request, changed)
+    if changed or deleted:
+        write_recipe_pages(root, request)
+    write_catalogs(root)
+    write_published(root, published)
+    swap_current(snapshot_root, release)
+    remove_old_releases(snapshot_root)
+    return len(changed) + len(deleted)
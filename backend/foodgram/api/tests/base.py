@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredientAmount,
+                            Subscription, Tag)
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+# Тесты идут в одном процессе и не требуют Redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-tests',
+    }
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CACHES=CACHES)
+class APITestCase(TestCase):
+    """Общие данные: теги, ингредиенты и фабрики пользователей и рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = Tag.objects.create(
+            name='Завтрак', color='#111111', slug='breakfast'
+        )
+        cls.lunch = Tag.objects.create(
+            name='Обед', color='#222222', slug='lunch'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(4)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(username):
+        return CustomUser.objects.create_user(
+            username=username, email=f'{username}@example.com',
+            password='Password-12345', first_name=username,
+            last_name=username
+        )
+
+    def create_recipe(self, author, name='Рецепт', cooking_time=10,
+                      tags=None, ingredients=None):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Описание',
+            cooking_time=cooking_time, image='recipes/images/recipe.png'
+        )
+        recipe.tags.set(tags or (self.breakfast,))
+        RecipeIngredientAmount.objects.bulk_create(
+            RecipeIngredientAmount(recipe=recipe, ingredient=ingredient,
+                                   amount=5)
+            for ingredient in ingredients or self.ingredients[:2]
+        )
+        return recipe
+
+    @staticmethod
+    def subscribe(user, author):
+        return Subscription.objects.create(user=user, author=author)
+
+    @staticmethod
+    def get_client(user=None):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
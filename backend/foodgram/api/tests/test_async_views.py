@@ -0,0 +1,57 @@
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from .base import CACHES, APITestCase
+from recipes.deletion import hide_user
+from recipes.models import Ingredient, Tag
+
+
+@override_settings(CACHES=CACHES)
+class AsyncViewsTests(TransactionTestCase):
+    # Асинхронные представления читают базу из пула потоков, поэтому
+    # данные должны быть зафиксированы.
+
+    def setUp(self):
+        tag = Tag.objects.create(name='Завтрак', color='#111111',
+                                 slug='breakfast')
+        ingredient = Ingredient.objects.create(name='соль',
+                                               measurement_unit='г')
+        factory = APITestCase()
+        factory.breakfast = tag
+        factory.ingredients = [ingredient]
+        self.user = APITestCase.create_user('reader')
+        self.authors = [APITestCase.create_user(f'author{index}')
+                        for index in range(3)]
+        for author in self.authors:
+            factory.create_recipe(author, tags=(tag,))
+            APITestCase.subscribe(self.user, author)
+        token = Token.objects.create(user=self.user)
+        self.headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def get(self, path):
+        # AsyncClient в Django 4.0 передает extra как заголовки ASGI.
+        response = async_to_sync(self.async_client.get)(
+            path, authorization=self.headers['HTTP_AUTHORIZATION']
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_subscriptions_skip_hidden_authors(self):
+        hide_user(self.authors[0])
+        data = self.get('/api/async/users/subscriptions/')
+        self.assertEqual(
+            {item['id'] for item in data['results']},
+            {author.id for author in self.authors[1:]}
+        )
+        self.assertEqual(
+            data, self.client.get('/api/users/subscriptions/',
+                                  **self.headers).json()
+        )
+
+    def test_recipes_match_sync_view(self):
+        data = self.get('/api/async/recipes/?fields=id,name,author,tags')
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(data, self.client.get(
+            '/api/recipes/?fields=id,name,author,tags', **self.headers
+        ).json())
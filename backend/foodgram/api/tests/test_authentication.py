@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+from .base import APITestCase
+from api.authentication import get_token_cache_key
+
+URL = '/api/users/me/'
+
+
+class TokenCacheTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        self.client = self.get_client(self.user)
+        self.assertEqual(self.client.get(URL).status_code, 200)
+        self.key = Token.objects.get(user=self.user).key
+        self.cache_key = get_token_cache_key(self.key)
+        self.assertIsNotNone(cache.get(self.cache_key))
+
+    def test_logout(self):
+        self.client.post('/api/auth/token/logout/')
+        self.assertIsNone(cache.get(self.cache_key))
+        self.assertEqual(self.client.get(URL).status_code, 401)
+
+    def test_set_password(self):
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'Password-12345',
+            'new_password': 'Another-password-678',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(cache.get(self.cache_key))
+
+    def test_deactivation(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(URL).status_code, 401)
+
+    def test_role_change(self):
+        self.user.role = 'admin'
+        self.user.save()
+        self.assertIsNone(cache.get(self.cache_key))
+        self.client.get(URL)
+        user, _ = cache.get(self.cache_key)
+        self.assertEqual(user.role, 'admin')
+
+    def test_entry_cached_before_commit_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # Конкурентная аутентификация до фиксации видит
+            # активного пользователя.
+            self.user.is_active = True
+            cache.set(self.cache_key, (self.user, None))
+        self.assertIsNone(cache.get(self.cache_key))
+        self.assertEqual(self.client.get(URL).status_code, 401)
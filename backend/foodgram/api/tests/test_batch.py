@@ -0,0 +1,175 @@
+import contextlib
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .base import CACHES, APITestCase
+from recipes.models import (Change, Favorite, Recipe, ShoppingCart,
+                            Subscription, TimelineEntry)
+from recipes.scores import get_favorite_weight
+
+
+def get_statuses(response):
+    return {
+        result['id']: result['status'] for result in response.data['results']
+    }
+
+
+class FavoriteBatchTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        author = self.create_user('author')
+        self.recipes = [
+            self.create_recipe(author, name=f'Рецепт {index}')
+            for index in range(3)
+        ]
+        self.ids = [recipe.id for recipe in self.recipes]
+        self.client = self.get_client(self.user)
+
+    def test_score_uses_stored_added_date(self):
+        self.client.post(
+            '/api/recipes/favorite_batch/', {'ids': self.ids}, format='json'
+        )
+        for favorite in Favorite.objects.filter(user=self.user):
+            recipe = Recipe.objects.get(pk=favorite.recipe_id)
+            self.assertEqual(recipe.favorites_count, 1)
+            self.assertEqual(
+                recipe.trending_score,
+                get_favorite_weight(favorite.added_date)
+            )
+
+    def delete_batch(self, ids):
+        self.client.post(
+            '/api/recipes/favorite_batch/', {'ids': ids}, format='json'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                '/api/recipes/favorite_batch/', {'ids': ids}, format='json'
+            )
+        self.assertEqual(set(get_statuses(response).values()), {'deleted'})
+        return len(queries)
+
+    def test_delete_is_batched(self):
+        self.assertEqual(self.delete_batch(self.ids[:1]),
+                         self.delete_batch(self.ids))
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
+        for recipe in Recipe.objects.filter(id__in=self.ids):
+            self.assertEqual(recipe.favorites_count, 0)
+            self.assertAlmostEqual(recipe.trending_score, 0)
+        self.assertEqual(Change.objects.filter(
+            kind=Change.FAVORITE, deleted=True
+        ).count(), 4)
+        response = self.client.get('/api/recipes/', {'is_favorited': 1})
+        self.assertEqual(response.data['count'], 0)
+
+
+class SubscribeBatchTests(APITestCase):
+
+    def test_statuses(self):
+        user = self.create_user('user')
+        authors = [self.create_user(f'author{index}') for index in range(2)]
+        self.subscribe(user, authors[0])
+        ids = [author.id for author in authors]
+        response = self.get_client(user).post(
+            '/api/users/subscribe_batch/',
+            {'ids': ids + [user.id, 10 ** 6]}, format='json'
+        )
+        self.assertEqual(get_statuses(response), {
+            authors[0].id: 'exists', authors[1].id: 'created',
+            user.id: 'self', 10 ** 6: 'not_found'
+        })
+        self.assertEqual(Change.objects.filter(
+            kind=Change.SUBSCRIPTION, object_id=authors[1].id
+        ).count(), 1)
+
+    def unsubscribe_batch(self, user, authors):
+        client = self.get_client(user)
+        ids = [author.id for author in authors]
+        client.post('/api/users/subscribe_batch/', {'ids': ids},
+                    format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.delete(
+                '/api/users/subscribe_batch/', {'ids': ids}, format='json'
+            )
+        self.assertEqual(set(get_statuses(response).values()), {'deleted'})
+        return len(queries)
+
+    def test_delete_is_batched(self):
+        user = self.create_user('user')
+        authors = [self.create_user(f'author{index}') for index in range(3)]
+        for author in authors:
+            self.create_recipe(author)
+        self.assertEqual(self.unsubscribe_batch(user, authors[:1]),
+                         self.unsubscribe_batch(user, authors))
+        self.assertFalse(Subscription.objects.filter(user=user).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=user).exists())
+        for author in authors:
+            author.refresh_from_db()
+            self.assertEqual(author.followers_count, 0)
+        self.assertEqual(Change.objects.filter(
+            kind=Change.SUBSCRIPTION, deleted=True
+        ).count(), 4)
+
+
+def postgres_locking():
+    """
+    На SQLite включает проверку select_for_update, которую выполняет
+    Postgres: блокировка вне транзакции - ошибка.
+    """
+    if connection.vendor == 'postgresql':
+        return contextlib.nullcontext()
+    stack = contextlib.ExitStack()
+    stack.enter_context(mock.patch.object(
+        connection.features, 'has_select_for_update', True
+    ))
+    stack.enter_context(mock.patch.object(
+        connection.ops, 'for_update_sql', return_value=''
+    ))
+    return stack
+
+
+@override_settings(CACHES=CACHES)
+class AutocommitBatchTests(TransactionTestCase):
+    # Без Idempotency-Key запрос выполняется в режиме autocommit, и
+    # транзакцию для lock_user открывает само представление.
+
+    def setUp(self):
+        cache.clear()
+        self.user = APITestCase.create_user('user')
+        author = APITestCase.create_user('author')
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=10,
+            image='recipes/images/recipe.png'
+        )
+        self.client = APITestCase.get_client(self.user)
+
+    def test_recipe_batches_lock_user_in_transaction(self):
+        for url, model in (
+            ('/api/recipes/favorite_batch/', Favorite),
+            ('/api/recipes/shopping_cart_batch/', ShoppingCart),
+        ):
+            with self.subTest(url=url), postgres_locking():
+                response = self.client.post(
+                    url, {'ids': [self.recipe.id]}, format='json'
+                )
+                self.assertEqual(response.data['created'], 1)
+                self.assertTrue(model.objects.filter(
+                    user=self.user, recipe=self.recipe
+                ).exists())
+                response = self.client.delete(
+                    url, {'ids': [self.recipe.id]}, format='json'
+                )
+                self.assertEqual(response.data['deleted'], 1)
+
+    def test_subscribe_batch_locks_user_in_transaction(self):
+        with postgres_locking():
+            response = self.client.post(
+                '/api/users/subscribe_batch/',
+                {'ids': [self.recipe.author_id]}, format='json'
+            )
+        self.assertEqual(response.data['created'], 1)
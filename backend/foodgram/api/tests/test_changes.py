@@ -0,0 +1,63 @@
+from django.urls import reverse
+
+from .base import APITestCase
+from recipes.changes import get_user_changes, log_changes
+from recipes.models import Change
+
+
+class ChangeSequenceTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        self.author = self.create_user('author')
+        self.client = self.get_client(self.user)
+        self.url = reverse('api:changes-list')
+
+    def test_late_commit_is_not_skipped(self):
+        log_changes(Change.FAVORITE, (1,), user_id=self.user.id)
+        log_changes(Change.SUBSCRIPTION, (self.author.id,),
+                    user_id=self.user.id)
+        # Запись с меньшим id не видна, пока ее транзакция не
+        # зафиксирована.
+        late = Change.objects.get(kind=Change.FAVORITE)
+        late_id = late.id
+        late.delete()
+        since = get_user_changes(self.user, 0, 10)[-1].sequence
+        late.id = late_id
+        late.save(force_insert=True)
+        changes = get_user_changes(self.user, since, 10)
+        self.assertEqual([change.id for change in changes], [late_id])
+        self.assertGreater(changes[0].sequence, since)
+
+    def test_limit_below_one_is_rejected(self):
+        for limit in (-5, 0):
+            with self.subTest(limit=limit):
+                response = self.client.get(self.url, {'limit': limit})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('limit', response.data)
+
+    def test_tag_edit_logs_recipe_upsert(self):
+        recipe = self.create_recipe(self.user, tags=(self.lunch,))
+        since = self.client.get(self.url).data['next']
+        self.lunch.name = 'Ужин'
+        self.lunch.save()
+        response = self.client.get(self.url, {'since': since})
+        self.assertEqual(response.status_code, 200)
+        [change] = response.data['changes']
+        self.assertEqual((change['type'], change['id'], change['op']),
+                         (Change.RECIPE, recipe.id, 'upsert'))
+        self.assertEqual(change['data']['tags'][0]['name'], 'Ужин')
+
+    def test_author_save_logs_only_name_changes(self):
+        recipe = self.create_recipe(self.author)
+        Change.objects.all().delete()
+        self.author.set_password('Another-password-1')
+        self.author.save()
+        self.assertFalse(Change.objects.exists())
+        self.author.last_name = 'Петров'
+        self.author.save()
+        self.assertEqual(
+            list(Change.objects.values_list('kind', 'object_id')),
+            [(Change.RECIPE, recipe.id)]
+        )
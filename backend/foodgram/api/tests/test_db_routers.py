@@ -0,0 +1,79 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .base import CACHES
+from foodgram.db_routers import ReplicaStickinessMiddleware
+from recipes.models import Tag
+
+# Вторая SQLite-база рядом с тестовой. Роутер только выбирает
+# псевдоним, запросы к реплике не выполняются.
+REPLICA = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'replica.sqlite3'}
+
+
+def record_routing(request):
+    request.read_db = Tag.objects.all().db
+    request.write_db = router.db_for_write(Tag)
+    with transaction.atomic():
+        request.atomic_read_db = Tag.objects.all().db
+
+
+def sync_view(request):
+    record_routing(request)
+    return HttpResponse()
+
+
+async def async_view(request):
+    request.read_db = Tag.objects.all().db
+    return HttpResponse()
+
+
+@override_settings(CACHES=CACHES, DATABASE_REPLICA_ALIAS='replica')
+@mock.patch.dict(settings.DATABASES, {'replica': REPLICA})
+class ReplicaRoutingTests(SimpleTestCase):
+    # transaction.atomic() открывает транзакцию на primary.
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def call(self, method, **extra):
+        request = getattr(self.factory, method)('/api/tags/', **extra)
+        response = ReplicaStickinessMiddleware(sync_view)(request)
+        return request, response
+
+    def test_get_reads_from_replica(self):
+        request, _ = self.call('get')
+        self.assertEqual(request.read_db, 'replica')
+        self.assertEqual(request.write_db, 'default')
+        self.assertEqual(request.atomic_read_db, 'default')
+
+    def test_write_goes_to_primary(self):
+        request, response = self.call('post')
+        self.assertEqual(request.read_db, 'default')
+        self.assertEqual(request.write_db, 'default')
+        self.assertIn('db_primary', response.cookies)
+
+    def test_cookie_pins_client_to_primary(self):
+        _, response = self.call('post')
+        self.factory.cookies = response.cookies
+        request, _ = self.call('get')
+        self.assertEqual(request.read_db, 'default')
+
+    def test_token_pins_client_to_primary(self):
+        self.call('post', HTTP_AUTHORIZATION='Token writer')
+        request, _ = self.call('get', HTTP_AUTHORIZATION='Token writer')
+        self.assertEqual(request.read_db, 'default')
+        request, _ = self.call('get', HTTP_AUTHORIZATION='Token reader')
+        self.assertEqual(request.read_db, 'replica')
+
+    def test_async_get_reads_from_replica(self):
+        request = self.factory.get('/api/tags/')
+        async_to_sync(ReplicaStickinessMiddleware(async_view))(request)
+        self.assertEqual(request.read_db, 'replica')
@@ -0,0 +1,54 @@
+from unittest import mock
+
+from .base import APITestCase
+from recipes.deletion import hide_recipe, hide_user
+from recipes.models import RecipeDocument, ShoppingCart
+
+
+class HiddenUserTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(self.author)
+        self.client = self.get_client()
+        # Документ собран до удаления автора.
+        self.assertEqual(
+            self.client.get(f'/api/recipes/{self.recipe.id}/').status_code,
+            200
+        )
+        self.assertTrue(RecipeDocument.objects.filter(
+            recipe=self.recipe
+        ).exists())
+
+    def test_hide_user_removes_documents(self):
+        hide_user(self.author)
+        self.assertFalse(RecipeDocument.objects.filter(
+            recipe=self.recipe
+        ).exists())
+
+    def test_detail_is_not_found_after_hide_user(self):
+        hide_user(self.author)
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_ids_reports_missing_after_hide_user(self):
+        hide_user(self.author)
+        response = self.client.get(f'/api/recipes/?ids={self.recipe.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['missing'], [self.recipe.id])
+
+
+class HiddenRecipeTests(APITestCase):
+
+    def test_shopping_list_skips_hidden_recipe(self):
+        user = self.create_user('user')
+        recipe = self.create_recipe(self.create_user('author'))
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+        hide_recipe(recipe)
+        with mock.patch('api.utils.canvas.Canvas') as canvas:
+            self.get_client(user).get('/api/recipes/download_shopping_cart/')
+        canvas.return_value.drawCentredString.assert_called_once_with(
+            315, 425, 'Список покупок пуст'
+        )
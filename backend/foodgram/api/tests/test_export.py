@@ -0,0 +1,64 @@
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.asgi import get_asgi_application
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from .base import CACHES, APITestCase
+from recipes.models import Recipe
+
+
+async def asgi_get(path, headers):
+    communicator = ApplicationCommunicator(get_asgi_application(), {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'query_string': b'',
+        'headers': headers, 'server': ('testserver', 80),
+    })
+    await communicator.send_input({'type': 'http.request', 'body': b''})
+    start = await communicator.receive_output(10)
+    body = b''
+    while True:
+        message = await communicator.receive_output(10)
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    await communicator.wait()
+    return start['status'], body
+
+
+def read_lines(body):
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+class ExportTests(APITestCase):
+
+    def test_export_ends_with_manifest(self):
+        user = self.create_user('user')
+        self.create_recipe(user)
+        response = self.get_client(user).get('/api/users/me/export/')
+        self.assertEqual(response.status_code, 200)
+        lines = read_lines(b''.join(response.streaming_content))
+        self.assertEqual(lines[-1]['type'], 'manifest')
+        self.assertEqual(lines[-1]['counts']['recipe'], 1)
+
+
+@override_settings(CACHES=CACHES)
+class AsgiExportTests(TransactionTestCase):
+    # Представление под ASGI выполняется в другом потоке, поэтому
+    # данные должны быть зафиксированы.
+
+    def test_export_is_complete(self):
+        user = APITestCase.create_user('user')
+        Recipe.objects.create(author=user, name='Рецепт', text='Описание',
+                              cooking_time=10, image='recipes/images/a.png')
+        token = Token.objects.create(user=user)
+        status, body = async_to_sync(asgi_get)('/api/users/me/export/', [
+            (b'authorization', f'Token {token.key}'.encode()),
+        ])
+        self.assertEqual(status, 200)
+        lines = read_lines(body)
+        self.assertEqual(lines[-1]['type'], 'manifest')
+        self.assertEqual(lines[-1]['counts']['recipe'], 1)
+        self.assertEqual(lines[0], {**lines[0], 'type': 'user', 'id': user.id})
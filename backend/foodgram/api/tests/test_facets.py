@@ -0,0 +1,58 @@
+from django.core.cache import cache
+
+from .base import APITestCase
+from recipes.facets import TAG_FACETS_KEY
+from recipes.models import Tag
+from recipes.tag_slugs import tag_slug_map
+
+
+class TagFacetsCacheTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        self.create_recipe(author, tags=(self.breakfast,))
+        self.create_recipe(author, cooking_time=60,
+                           tags=(self.breakfast, self.lunch))
+        self.client = self.get_client()
+
+    def test_unfiltered_facets_are_cached(self):
+        response = self.client.get('/api/recipes/?facets=tags')
+        expected = {'breakfast': 2, 'lunch': 1}
+        self.assertEqual(response.data['facets']['tags'], expected)
+        self.assertEqual(cache.get(TAG_FACETS_KEY), expected)
+
+    def test_tags_filter_does_not_disable_cache(self):
+        self.client.get('/api/recipes/?facets=tags&tags=lunch')
+        self.assertIsNotNone(cache.get(TAG_FACETS_KEY))
+
+    def test_filtered_facets_are_not_cached(self):
+        response = self.client.get(
+            '/api/recipes/?facets=tags&cooking_time_max=30'
+        )
+        self.assertEqual(
+            response.data['facets']['tags'], {'breakfast': 1, 'lunch': 0}
+        )
+        self.assertIsNone(cache.get(TAG_FACETS_KEY))
+
+
+class TagSlugMapTests(APITestCase):
+
+    def test_flushed_cache_does_not_reuse_slug_map(self):
+        client = self.get_client()
+        client.get('/api/recipes/?tags=breakfast')
+        for slug, color in (('dinner', '#333333'), ('supper', '#444444')):
+            # Сброс кэша теряет версию соответствия slug -> id.
+            cache.clear()
+            Tag.objects.create(name=slug, color=color, slug=slug)
+            response = client.get(f'/api/recipes/?tags={slug}')
+            self.assertEqual(response.status_code, 200)
+
+    def test_slug_map_built_before_commit_is_not_reused(self):
+        client = self.get_client()
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='dinner', color='#333333', slug='dinner')
+            # Конкурентное чтение до фиксации не видит новый тег.
+            tag_slug_map.get_map().pop('dinner')
+        response = client.get('/api/recipes/?tags=dinner')
+        self.assertEqual(response.status_code, 200)
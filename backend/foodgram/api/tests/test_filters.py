@@ -0,0 +1,65 @@
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory
+
+from .base import APITestCase
+from api.filters import RecipeFilter
+from recipes.models import Recipe
+
+# PostgreSQL: "Index Scan using <name>", "Bitmap Index Scan on <name>";
+# SQLite: "USING INDEX <name>".
+INDEX_NAME = re.compile(r'(?:Scan using|Index Scan on|INDEX) (\w+)')
+
+
+class RecipeFilterPlanTests(APITestCase):
+    """Фильтры по времени и ингредиентам используют свои индексы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        for index in range(20):
+            cls.create_recipe(
+                cls, author, name=f'Рецепт {index}', cooking_time=index + 1,
+                ingredients=cls.ingredients[index % 3:index % 3 + 2]
+            )
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            # На маленькой таблице планировщик выбрал бы полный просмотр.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def get_used_indexes(self, params):
+        request = RequestFactory().get('/api/recipes/')
+        request.user = AnonymousUser()
+        filterset = RecipeFilter(
+            QueryDict(params), queryset=Recipe.objects.all(), request=request
+        )
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return set(INDEX_NAME.findall(filterset.qs.explain()))
+
+    def test_cooking_time_uses_index(self):
+        self.assertIn(
+            'recipe_cooking_time_idx',
+            self.get_used_indexes('cooking_time_min=5&cooking_time_max=10')
+        )
+
+    def test_tags_use_index(self):
+        self.assertIn(
+            'recipe_tags_tag_recipe_idx',
+            self.get_used_indexes('tags=breakfast')
+        )
+
+    def test_ingredients_use_index(self):
+        ingredient = self.ingredients[0].id
+        for params in (f'ingredients={ingredient}',
+                       f'exclude_ingredients={ingredient}'):
+            with self.subTest(params=params):
+                self.assertIn(
+                    'ingredient_recipe_idx', self.get_used_indexes(params)
+                )
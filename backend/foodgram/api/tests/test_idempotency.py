@@ -0,0 +1,129 @@
+import threading
+import time
+from unittest import mock, skipUnless
+
+from django.db import connection, connections
+from django.test import TransactionTestCase, override_settings
+from rest_framework.response import Response
+
+from .base import CACHES, APITestCase
+from api.idempotency import REPLAYED_HEADER, get_fingerprint
+from api.views import RecipeViewSet
+from recipes.models import Favorite, IdempotencyKey
+
+URL = '/api/recipes/favorite_batch/'
+
+
+class IdempotencyTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        author = self.create_user('author')
+        self.ids = [self.create_recipe(author).id for _ in range(2)]
+        self.client = self.get_client(self.user)
+        original = RecipeViewSet.control_existence_batch
+        patcher = mock.patch.object(
+            RecipeViewSet, 'control_existence_batch', autospec=True,
+            side_effect=original
+        )
+        self.view = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, ids=None, key='key-1'):
+        return self.client.post(
+            URL, {'ids': ids or self.ids}, format='json',
+            HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_repeat_replays_stored_response(self):
+        first = self.post()
+        second = self.post()
+        self.assertEqual(self.view.call_count, 1)
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second[REPLAYED_HEADER], 'true')
+        self.assertEqual(Favorite.objects.filter(user=self.user).count(), 2)
+
+    def test_other_key_runs_view(self):
+        self.post()
+        response = self.post(key='key-2')
+        self.assertEqual(self.view.call_count, 2)
+        self.assertNotIn(REPLAYED_HEADER, response)
+
+    def test_server_error_is_not_stored(self):
+        self.view.side_effect = [Response(status=503), mock.DEFAULT]
+        self.view.return_value = Response({'ok': True})
+        self.assertEqual(self.post().status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.view.call_count, 2)
+
+    def test_exception_is_not_stored(self):
+        self.view.side_effect = RuntimeError
+        with self.assertRaises(RuntimeError):
+            self.post()
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_request_in_progress_is_rejected(self):
+        # Запись без ответа: первый запрос с этим ключом еще выполняется.
+        request = mock.Mock(method='POST', path=URL, data={'ids': self.ids})
+        IdempotencyKey.objects.create(
+            user=self.user, key='key-1', fingerprint=get_fingerprint(request)
+        )
+        response = self.post()
+        self.assertEqual(response.status_code, 409)
+        self.view.assert_not_called()
+
+    def test_same_key_with_other_body_is_rejected(self):
+        self.post()
+        response = self.post(ids=self.ids[:1])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.view.call_count, 1)
+
+
+@skipUnless(connection.features.has_select_for_update,
+            'нужны блокировки строк')
+@override_settings(CACHES=CACHES)
+class ConcurrentIdempotencyTests(TransactionTestCase):
+
+    def test_concurrent_duplicate_does_not_run(self):
+        user = APITestCase.create_user('user')
+        client = APITestCase.get_client(user)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_view(viewset, model, request):
+            calls.append(request)
+            started.set()
+            release.wait(10)
+            return Response({'ok': True}, status=201)
+
+        responses = {}
+
+        def post(name):
+            try:
+                responses[name] = client.post(
+                    URL, {'ids': [1]}, format='json',
+                    HTTP_IDEMPOTENCY_KEY='key-1'
+                )
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(RecipeViewSet, 'control_existence_batch',
+                               slow_view):
+            first = threading.Thread(target=post, args=('first',))
+            first.start()
+            started.wait(10)
+            second = threading.Thread(target=post, args=('second',))
+            second.start()
+            # Дубль ждет на уникальном индексе ключа.
+            time.sleep(0.5)
+            release.set()
+            first.join(10)
+            second.join(10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(responses['first'].status_code, 201)
+        self.assertEqual(responses['second'].status_code, 201)
+        self.assertEqual(responses['second'][REPLAYED_HEADER], 'true')
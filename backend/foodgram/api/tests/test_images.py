@@ -0,0 +1,93 @@
+import base64
+import io
+import os
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+
+from .base import APITestCase
+from recipes.deletion import hide_recipe
+from recipes.storage import ContentHashStorage, recipe_image_storage
+
+
+def make_png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def to_data_uri(content):
+    return 'data:image/png;base64,' + base64.b64encode(content).decode()
+
+
+class RecipeImageTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.client = self.get_client(self.author)
+
+    def save_image(self, content):
+        return recipe_image_storage.save(
+            'recipes/images/upload.png', ContentFile(content)
+        )
+
+    def test_same_content_is_stored_once(self):
+        content = make_png('red')
+        first = self.save_image(content)
+        second = self.save_image(content)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, self.save_image(make_png('blue')))
+        self.assertTrue(os.path.exists(
+            os.path.join(settings.MEDIA_ROOT, first)
+        ))
+
+    def test_unchanged_image_is_not_written_on_patch(self):
+        content = make_png('green')
+        recipe = self.create_recipe(self.author)
+        recipe.image = self.save_image(content)
+        recipe.save()
+        with mock.patch.object(ContentHashStorage, '_save') as save:
+            response = self.client.patch(
+                f'/api/recipes/{recipe.id}/',
+                {
+                    'image': to_data_uri(content), 'name': 'Новое название',
+                    'tags': [self.breakfast.id],
+                    'ingredients': [
+                        {'id': self.ingredients[0].id, 'amount': 5}
+                    ],
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        save.assert_not_called()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.image.name, self.save_image(content))
+
+    def test_collector_keeps_images_of_hidden_recipes(self):
+        recipe = self.create_recipe(self.author)
+        recipe.image = self.save_image(make_png('white'))
+        recipe.save()
+        hide_recipe(recipe)
+        orphan = self.save_image(make_png('black'))
+        call_command('collect_orphan_images', min_age=0,
+                     stdout=io.StringIO())
+        self.assertTrue(recipe_image_storage.exists(recipe.image.name))
+        self.assertFalse(recipe_image_storage.exists(orphan))
+
+    def test_collector_keeps_reuploaded_orphan(self):
+        content = make_png('yellow')
+        orphan = self.save_image(content)
+        path = recipe_image_storage.path(orphan)
+        old = time.time() - 2 * 60 * 60
+        os.utime(path, (old, old))
+        # Новый рецепт загрузил то же изображение, но еще не сохранен.
+        self.assertEqual(self.save_image(content), orphan)
+        call_command('collect_orphan_images', min_age=60,
+                     stdout=io.StringIO())
+        self.assertTrue(recipe_image_storage.exists(orphan))
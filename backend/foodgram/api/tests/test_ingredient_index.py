@@ -0,0 +1,163 @@
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from .base import APITestCase
+from recipes.deletion import hide_recipe
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredientAmount
+
+URL = '/api/recipes/from_ingredients/'
+
+
+def search_orm(ingredient_ids, tags=None, cooking_time_min=None,
+               cooking_time_max=None):
+    """Тот же подбор соединениями через RecipeIngredientAmount."""
+    recipes = Recipe.objects.all()
+    if tags:
+        recipes = recipes.filter(tags__slug__in=tags).distinct()
+    if cooking_time_min is not None:
+        recipes = recipes.filter(cooking_time__gte=cooking_time_min)
+    if cooking_time_max is not None:
+        recipes = recipes.filter(cooking_time__lte=cooking_time_max)
+    recipes = Recipe.objects.filter(id__in=recipes.values('id')).annotate(
+        matched=Count(
+            'recipe', filter=Q(recipe__ingredient_id__in=ingredient_ids)
+        ),
+        size=Count('recipe'),
+    ).filter(matched__gt=0).annotate(
+        missing=F('size') - F('matched'),
+        coverage=Cast('matched', FloatField()) / F('size'),
+    ).order_by('-coverage', 'missing', '-id')
+    return [
+        {
+            'id': recipe.id,
+            'matched': recipe.matched,
+            'missing': recipe.missing,
+            'coverage': round(recipe.coverage, 4),
+        }
+        for recipe in recipes
+    ]
+
+
+class IngredientIndexTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        first, second, third, fourth = self.ingredients
+        self.recipes = [
+            self.create_recipe(author, cooking_time=5,
+                               ingredients=(first,)),
+            self.create_recipe(author, cooking_time=15,
+                               tags=(self.lunch,),
+                               ingredients=(first, second)),
+            self.create_recipe(author, cooking_time=25,
+                               tags=(self.breakfast, self.lunch),
+                               ingredients=(first, second, third)),
+            self.create_recipe(author, cooking_time=35,
+                               ingredients=(second, third, fourth)),
+        ]
+        self.client = self.get_client()
+
+    def get_ids(self, *ingredients, **params):
+        response = self.client.get(URL, {
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            **params
+        })
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_search_matches_orm(self):
+        ids = [ingredient.id for ingredient in self.ingredients]
+        cases = (
+            {'ingredient_ids': ids[:1]},
+            {'ingredient_ids': ids[:2]},
+            {'ingredient_ids': ids[1:3] + ids[1:2]},
+            {'ingredient_ids': ids},
+            {'ingredient_ids': [ids[3], 0]},
+            {'ingredient_ids': ids[:2], 'tags': ['lunch']},
+            {'ingredient_ids': ids, 'tags': ['breakfast', 'missing']},
+            {'ingredient_ids': ids, 'cooking_time_min': 15},
+            {'ingredient_ids': ids, 'cooking_time_max': 25},
+            {'ingredient_ids': ids, 'tags': ['lunch'],
+             'cooking_time_min': 20, 'cooking_time_max': 40},
+        )
+        for params in cases:
+            with self.subTest(**params):
+                self.assertEqual(
+                    ingredient_index.search(**params), search_orm(**params)
+                )
+
+    def test_endpoint_ranks_by_coverage(self):
+        first, second, *_ = self.ingredients
+        self.assertEqual(
+            self.get_ids(first, second),
+            [self.recipes[1].id, self.recipes[0].id,
+             self.recipes[2].id, self.recipes[3].id]
+        )
+
+    def test_new_ingredient_amount_is_found(self):
+        fourth = self.ingredients[3]
+        self.assertEqual(self.get_ids(fourth), [self.recipes[3].id])
+        RecipeIngredientAmount.objects.create(
+            recipe=self.recipes[0], ingredient=fourth, amount=1
+        )
+        self.assertEqual(
+            self.get_ids(fourth), [self.recipes[0].id, self.recipes[3].id]
+        )
+
+    def test_cooking_time_change_is_found(self):
+        first = self.ingredients[0]
+        self.assertEqual(self.get_ids(first, cooking_time_max=10),
+                         [self.recipes[0].id])
+        recipe = self.recipes[2]
+        recipe.cooking_time = 10
+        recipe.save()
+        self.assertEqual(self.get_ids(first, cooking_time_max=10),
+                         [self.recipes[0].id, recipe.id])
+
+    def test_tag_change_is_found(self):
+        first = self.ingredients[0]
+        self.assertEqual(self.get_ids(first, tags='breakfast'),
+                         [self.recipes[0].id, self.recipes[2].id])
+        self.recipes[0].tags.set((self.lunch,))
+        self.assertEqual(self.get_ids(first, tags='breakfast'),
+                         [self.recipes[2].id])
+
+    def test_hidden_recipe_is_not_found(self):
+        first = self.ingredients[0]
+        self.get_ids(first)
+        hide_recipe(self.recipes[0])
+        self.assertNotIn(self.recipes[0].id, self.get_ids(first))
+
+    def test_deleted_ingredient_is_not_counted(self):
+        first, second, third, _ = self.ingredients
+        self.get_ids(first)
+        Ingredient.objects.filter(id=third.id).delete()
+        results = ingredient_index.search([first.id, second.id])
+        self.assertEqual(results, search_orm([first.id, second.id]))
+        self.assertEqual(results[0]['id'], self.recipes[2].id)
+
+    def test_snapshot_built_before_commit_is_not_reused(self):
+        recipe = self.recipes[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.cooking_time = 50
+            recipe.save()
+            # Конкурентное чтение до фиксации видело бы старые данные.
+            snapshot = ingredient_index.get_snapshot()
+        self.assertIsNot(ingredient_index.get_snapshot(), snapshot)
+
+    def test_flushed_cache_does_not_reuse_snapshot(self):
+        first = self.ingredients[0]
+        recipe = self.recipes[0]
+        for cooking_time in (50, 60):
+            # Сброс кэша (перезапуск, вытеснение) теряет версию, и
+            # после одной записи она снова та же, что у старого снимка.
+            cache.clear()
+            recipe.cooking_time = cooking_time
+            recipe.save()
+            self.assertEqual(
+                self.get_ids(first, cooking_time_min=cooking_time),
+                [recipe.id]
+            )
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+
+from .base import APITestCase
+from recipes.membership import (FAVORITE, get_cache_key, get_recipe_ids,
+                                get_version_key, pack)
+from recipes.models import Favorite
+
+
+class RecipeIdsCacheTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        self.recipe = self.create_recipe(self.user)
+
+    def test_change_invalidates_cached_set(self):
+        self.assertEqual(get_recipe_ids(FAVORITE, self.user.id), frozenset())
+        favorite = Favorite.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(get_recipe_ids(FAVORITE, self.user.id),
+                         {self.recipe.id})
+        favorite.delete()
+        self.assertEqual(get_recipe_ids(FAVORITE, self.user.id), frozenset())
+
+    def test_stale_reader_does_not_overwrite(self):
+        # Читатель загрузил множество до добавления и сохраняет его после.
+        key = get_cache_key(FAVORITE, self.user.id)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        cache.set(key, pack(()))
+        self.assertEqual(get_recipe_ids(FAVORITE, self.user.id),
+                         {self.recipe.id})
+
+    def test_evicted_version_does_not_reuse_old_set(self):
+        get_recipe_ids(FAVORITE, self.user.id)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        # Вытеснена только версия; множество под старой версией живо.
+        cache.delete(get_version_key(FAVORITE, self.user.id))
+        self.assertEqual(get_recipe_ids(FAVORITE, self.user.id),
+                         {self.recipe.id})
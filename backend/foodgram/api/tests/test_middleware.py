@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.core.cache import cache
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+
+from .base import CACHES, APITestCase
+from api.response_cache import VERSION_KEY, ResponseCacheMiddleware
+from api.throttling import RateLimitHeadersMiddleware, TokenBucketThrottle
+from foodgram.compression import CompressionMiddleware
+from foodgram.db_routers import ReplicaStickinessMiddleware
+from foodgram.middleware import HybridMiddleware
+from recipes.models import Tag
+
+# От внутреннего к внешнему, как в settings.MIDDLEWARE.
+MIDDLEWARE = (
+    RateLimitHeadersMiddleware,
+    ResponseCacheMiddleware,
+    ReplicaStickinessMiddleware,
+    CompressionMiddleware,
+)
+
+
+async def async_view(request):
+    request.rate_limit = (10, 9, 1)
+    return HttpResponse(b'{"results": []}' * 100,
+                        content_type='application/json')
+
+
+def sync_view(request):
+    request.rate_limit = (10, 9, 1)
+    return HttpResponse(b'{"results": []}' * 100,
+                        content_type='application/json')
+
+
+@override_settings(CACHES=CACHES)
+class HybridMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def get_request(self):
+        return RequestFactory().get(
+            '/api/tags/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+    def test_async_chain_stays_async(self):
+        handler = async_view
+        for middleware in MIDDLEWARE:
+            handler = middleware(handler)
+            self.assertTrue(asyncio.iscoroutinefunction(handler))
+        response = async_to_sync(handler)(self.get_request())
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['RateLimit-Remaining'], '9')
+
+    def test_async_hooks_leave_event_loop(self):
+        threads = []
+
+        class RecordingMiddleware(HybridMiddleware):
+            def process_request(self, request):
+                threads.append(threading.get_ident())
+
+            def process_response(self, request, response):
+                threads.append(threading.get_ident())
+                return response
+
+        async def view(request):
+            threads.append(threading.get_ident())
+            return HttpResponse()
+
+        async_to_sync(RecordingMiddleware(view))(self.get_request())
+        loop_thread = threads[1]
+        self.assertNotEqual(threads[0], loop_thread)
+        self.assertNotEqual(threads[2], loop_thread)
+
+    def test_sync_chain(self):
+        handler = sync_view
+        for middleware in MIDDLEWARE:
+            handler = middleware(handler)
+            self.assertFalse(asyncio.iscoroutinefunction(handler))
+        response = handler(self.get_request())
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['RateLimit-Remaining'], '9')
+
+
+@override_settings(CACHES=CACHES)
+class AsyncThrottleTests(TransactionTestCase):
+    # Асинхронные представления читают базу из других потоков, поэтому
+    # данные должны быть зафиксированы.
+
+    def setUp(self):
+        cache.clear()
+
+    def test_async_tag_list_is_throttled(self):
+        rates = {'anon.tags': '1/min'}
+        with mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', rates):
+            first = self.client.get('/api/async/tags/')
+            second = self.client.get('/api/async/tags/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertIn('Retry-After', second)
+
+
+class ResponseCacheTests(APITestCase):
+
+    def get_slugs(self):
+        response = self.client.get('/api/tags/')
+        return [tag['slug'] for tag in json.loads(response.content)]
+
+    def test_evicted_version_does_not_reuse_old_responses(self):
+        self.client = self.get_client()
+        self.get_slugs()
+        Tag.objects.create(name='Ужин', color='#333333', slug='dinner')
+        self.assertIn('dinner', self.get_slugs())
+        # Вытеснена только версия; ответы под старыми версиями живы.
+        cache.delete(VERSION_KEY)
+        self.assertIn('dinner', self.get_slugs())
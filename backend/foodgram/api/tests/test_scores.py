@@ -0,0 +1,52 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from .base import APITestCase
+from recipes.models import Favorite, TrendingEpoch
+from recipes.scores import get_epoch, refresh_recipe_scores
+
+
+class TrendingScoreTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(self.author)
+        self.users = [self.create_user(f'user{index}') for index in range(5)]
+
+    def add_favorites(self, users, added_date):
+        with mock.patch('django.utils.timezone.now',
+                        return_value=added_date):
+            return [
+                Favorite.objects.create(user=user, recipe=self.recipe)
+                for user in users
+            ]
+
+    def test_removing_all_favorites_resets_score(self):
+        now = timezone.now()
+        old = self.add_favorites(self.users[:2], now - timedelta(days=300))
+        new = self.add_favorites(self.users[2:], now)
+        for favorite in new + old:
+            favorite.delete()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertAlmostEqual(self.recipe.trending_score, 0, places=9)
+
+    def test_refresh_advances_epoch_and_rebases_scores(self):
+        TrendingEpoch.objects.filter(pk=1).update(
+            epoch=timezone.now() - timedelta(days=365)
+        )
+        self.add_favorites(self.users, timezone.now())
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.trending_score, 1e30)
+        refresh_recipe_scores()
+        self.assertLess(timezone.now() - get_epoch(), timedelta(minutes=1))
+        self.recipe.refresh_from_db()
+        self.assertAlmostEqual(
+            self.recipe.trending_score, len(self.users), places=3
+        )
+        Favorite.objects.filter(recipe=self.recipe).delete()
+        self.recipe.refresh_from_db()
+        self.assertAlmostEqual(self.recipe.trending_score, 0, places=9)
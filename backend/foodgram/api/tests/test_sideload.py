@@ -0,0 +1,37 @@
+from .base import APITestCase
+
+
+class RecipeSideloadTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(
+            self.author, tags=(self.breakfast, self.lunch)
+        )
+        self.client = self.get_client()
+
+    def assert_included(self, response):
+        self.assertEqual(response.status_code, 200)
+        included = response.data['included']
+        self.assertEqual(set(included['authors']), {self.author.id})
+        self.assertEqual(
+            set(included['tags']), {self.breakfast.id, self.lunch.id}
+        )
+        self.assertEqual(
+            set(included['ingredients']),
+            {ingredient.id for ingredient in self.ingredients[:2]}
+        )
+
+    def test_sideload(self):
+        self.assert_included(self.client.get('/api/recipes/?sideload=1'))
+
+    def test_sideload_with_expanded_author(self):
+        self.assert_included(
+            self.client.get('/api/recipes/?sideload=1&expand=author')
+        )
+
+    def test_sideload_with_expanded_tags_and_ingredients(self):
+        self.assert_included(self.client.get(
+            '/api/recipes/?sideload=1&expand=tags,ingredients'
+        ))
@@ -0,0 +1,28 @@
+from unittest import mock
+
+from .base import APITestCase
+from recipes.models import RecipeDocument
+
+
+class AuthorDocumentTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(self.author)
+        self.client = self.get_client()
+        self.client.get(f'/api/recipes/{self.recipe.id}/')
+
+    def test_name_change_rebuilds_documents(self):
+        self.author.first_name = 'Иван'
+        self.author.save()
+        document = RecipeDocument.objects.get(recipe=self.recipe)
+        self.assertEqual(document.data['author']['first_name'], 'Иван')
+
+    def test_other_fields_skip_rebuild(self):
+        with mock.patch('api.signals.rebuild_documents') as rebuild:
+            self.author.set_password('Another-password-1')
+            self.author.save()
+            self.author.is_staff = True
+            self.author.save(update_fields=('is_staff',))
+        rebuild.assert_not_called()
@@ -0,0 +1,106 @@
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .base import APITestCase
+from recipes.models import Ingredient, Recipe, SimilarRecipe
+from recipes.similarity import (CSRMatrix, compute_neighbours, get_scores,
+                                rebuild_similar_recipes,
+                                update_similar_recipes)
+
+
+class SparseNeighboursTests(SimpleTestCase):
+    """Разреженный расчет совпадает с полным перебором плотной матрицы."""
+
+    def test_matches_dense(self):
+        random = np.random.default_rng(0)
+        n_rows, n_columns = 300, 40
+        dense = random.random((n_rows, n_columns)) < 0.1
+        rows, columns = np.nonzero(dense)
+        matrix = CSRMatrix.from_pairs(
+            rows[::-1].copy(), columns[::-1].copy(), n_rows, n_columns
+        )
+        recipe_ids = np.arange(n_rows) + 1000
+        dense = dense.astype(np.float32)
+        sizes = dense.sum(axis=1)
+        for metric in ('jaccard', 'cosine'):
+            expected = get_scores(
+                dense @ dense.T, sizes[:, None], sizes[None, :], metric
+            )
+            np.fill_diagonal(expected, 0)
+            for recipe_id, similar in compute_neighbours(
+                recipe_ids, matrix, 5, metric
+            ):
+                row = recipe_id - 1000
+                scores = [score for _, score in similar]
+                top = np.sort(expected[row])[::-1][:5]
+                np.testing.assert_allclose(scores, top[top > 0], rtol=1e-6)
+                for similar_id, score in similar:
+                    self.assertAlmostEqual(
+                        expected[row, similar_id - 1000], score, places=6
+                    )
+
+
+class HiddenSimilarTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        both = self.ingredients[:2]
+        self.recipe = self.create_recipe(author, ingredients=both)
+        self.hidden = self.create_recipe(author, ingredients=both)
+        self.other = self.create_recipe(author,
+                                        ingredients=self.ingredients[:1])
+        # Скрыт, но еще не удален purge_deleted.
+        Recipe.all_objects.filter(pk=self.hidden.pk).update(
+            deleted_at=timezone.now()
+        )
+        self.client = self.get_client()
+
+    def get_similar_ids(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/similar/')
+        return [item['id'] for item in response.data]
+
+    def test_rebuild_skips_hidden_recipes(self):
+        rebuild_similar_recipes(count=1, metric='jaccard')
+        self.assertEqual(self.get_similar_ids(), [self.other.id])
+        self.assertFalse(SimilarRecipe.objects.filter(
+            recipe_id=self.hidden.id
+        ).exists())
+
+    def test_update_skips_hidden_recipes(self):
+        update_similar_recipes(self.recipe.id, count=1, metric='jaccard')
+        self.assertEqual(self.get_similar_ids(), [self.other.id])
+
+
+class UpdateSimilarTests(APITestCase):
+
+    def count_update_queries(self, size):
+        """
+        Каждый из size рецептов делит с новым один ингредиент, и новый
+        вытесняет единственного соседа из каждого списка.
+        """
+        author = self.create_user(f'author{size}')
+        shared = Ingredient.objects.create(name=f'общий {size}',
+                                           measurement_unit='г')
+        for index in range(size):
+            unique = Ingredient.objects.create(
+                name=f'ингредиент {size} {index}', measurement_unit='г'
+            )
+            self.create_recipe(author, ingredients=(shared, unique))
+        rebuild_similar_recipes(count=1, metric='jaccard')
+        recipe = self.create_recipe(author, ingredients=(shared,))
+        with CaptureQueriesContext(connection) as queries:
+            update_similar_recipes(recipe.id, count=1, metric='jaccard')
+        neighbours = SimilarRecipe.objects.filter(
+            recipe__author=author
+        ).exclude(recipe=recipe)
+        self.assertEqual(neighbours.count(), size)
+        self.assertEqual(neighbours.filter(similar=recipe).count(), size)
+        return len(queries)
+
+    def test_displacement_is_batched(self):
+        self.assertEqual(self.count_update_queries(2),
+                         self.count_update_queries(6))
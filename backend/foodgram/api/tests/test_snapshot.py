@@ -0,0 +1,143 @@
+import json
+import os
+import shutil
+import re
+import tempfile
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from .base import APITestCase
+from api.snapshot import (CURRENT, RECIPES_DIR, RELEASES, publish_changes,
+                          publish_snapshot, swap_current)
+from recipes.models import RecipeDocument
+
+
+NGINX_CONF = os.path.join(settings.BASE_DIR, '..', '..', 'infra',
+                          'nginx.conf')
+
+
+def read_json(root, *path):
+    with open(os.path.join(root, *path)) as file:
+        return json.load(file)
+
+
+@override_settings(SNAPSHOT_KEEP_RELEASES=1, COMPRESS_MIN_SIZE=10 ** 9)
+class SnapshotTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.snapshot_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_root)
+        author = self.create_user('author')
+        self.recipes = [
+            self.create_recipe(author, name=f'Рецепт {index}')
+            for index in range(3)
+        ]
+
+    def get_current(self):
+        return os.path.realpath(os.path.join(self.snapshot_root, CURRENT))
+
+    def get_releases(self):
+        return sorted(os.listdir(os.path.join(self.snapshot_root, RELEASES)))
+
+    def test_full_publish(self):
+        self.assertEqual(publish_snapshot(self.snapshot_root), 3)
+        current = self.get_current()
+        self.assertEqual(os.path.dirname(current),
+                         os.path.join(self.snapshot_root, RELEASES))
+        page = read_json(current, RECIPES_DIR, 'page-1.json')
+        self.assertEqual(page['count'], 3)
+        for recipe in self.recipes:
+            detail = read_json(current, RECIPES_DIR, f'{recipe.id}.json')
+            self.assertEqual(detail['name'], recipe.name)
+        self.assertEqual(
+            [tag['slug'] for tag in read_json(current, 'tags.json')],
+            ['breakfast', 'lunch']
+        )
+
+    def test_incremental_publish_builds_new_release(self):
+        publish_snapshot(self.snapshot_root)
+        old = self.get_current()
+        changed, same = self.recipes[:2]
+        changed.name = 'Новое название'
+        changed.save()
+        self.recipes[2].delete()
+        self.assertEqual(publish_changes(self.snapshot_root), 2)
+        new = self.get_current()
+        self.assertNotEqual(new, old)
+        # Прежний выпуск не тронут: читатель видит его целиком.
+        self.assertEqual(
+            read_json(old, RECIPES_DIR, f'{changed.id}.json')['name'],
+            'Рецепт 0'
+        )
+        self.assertEqual(
+            read_json(old, RECIPES_DIR, 'page-1.json')['count'], 3
+        )
+        self.assertEqual(
+            read_json(new, RECIPES_DIR, f'{changed.id}.json')['name'],
+            'Новое название'
+        )
+        self.assertEqual(
+            read_json(new, RECIPES_DIR, 'page-1.json')['count'], 2
+        )
+        self.assertFalse(os.path.exists(os.path.join(
+            new, RECIPES_DIR, f'{self.recipes[2].id}.json'
+        )))
+        # Неизмененные файлы - жесткие ссылки на прежние.
+        self.assertTrue(os.path.samefile(
+            os.path.join(old, RECIPES_DIR, f'{same.id}.json'),
+            os.path.join(new, RECIPES_DIR, f'{same.id}.json')
+        ))
+
+    def test_document_saved_before_publish_is_not_skipped(self):
+        publish_snapshot(self.snapshot_root)
+        recipe = self.recipes[0]
+        recipe.name = 'Новое название'
+        recipe.save()
+        self.client.get(f'/api/recipes/{recipe.id}/')
+        # Документ сохранен до прошлой публикации, а его транзакция
+        # зафиксирована после нее.
+        RecipeDocument.objects.filter(recipe=recipe).update(
+            updated=timezone.now() - timedelta(hours=1)
+        )
+        publish_changes(self.snapshot_root)
+        self.assertEqual(
+            read_json(self.get_current(), RECIPES_DIR,
+                      f'{recipe.id}.json')['name'],
+            'Новое название'
+        )
+
+    def test_old_releases_are_removed(self):
+        publish_snapshot(self.snapshot_root)
+        publish_changes(self.snapshot_root)
+        publish_changes(self.snapshot_root)
+        releases = self.get_releases()
+        self.assertEqual(len(releases), 2)
+        self.assertEqual(os.path.basename(self.get_current()), releases[-1])
+
+    def test_swap_current_replaces_link(self):
+        releases = os.path.join(self.snapshot_root, RELEASES)
+        for release in ('a', 'b'):
+            os.makedirs(os.path.join(releases, release))
+        swap_current(self.snapshot_root, 'a')
+        swap_current(self.snapshot_root, 'b')
+        link = os.path.join(self.snapshot_root, CURRENT)
+        self.assertTrue(os.path.islink(link))
+        self.assertEqual(os.readlink(link), os.path.join(RELEASES, 'b'))
+        self.assertEqual(sorted(os.listdir(self.snapshot_root)),
+                         [CURRENT, RELEASES])
+
+
+@skipUnless(os.path.exists(NGINX_CONF), 'нет infra/nginx.conf')
+class NginxSnapshotMapTests(SimpleTestCase):
+
+    def test_limit_matches_page_size(self):
+        with open(NGINX_CONF) as file:
+            limits = set(re.findall(r'limit=(\d+)', file.read()))
+        self.assertEqual(
+            limits, {str(settings.REST_FRAMEWORK['PAGE_SIZE'])}
+        )
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from .base import APITestCase
+from api.throttling import TokenBucketThrottle
+
+URL = '/api/recipes/'
+# Ведро на 20 токенов наполняется по токену за 3 секунды.
+RATES = {'user.recipes': '20/min', 'user.tags': '1/min'}
+
+
+class TokenBucketThrottleTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        for target, value in (
+            ('THROTTLE_RATES', RATES),
+            ('timer', mock.Mock(side_effect=lambda: self.now)),
+        ):
+            patcher = mock.patch.object(TokenBucketThrottle, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = self.get_client(self.create_user('user'))
+
+    def create(self):
+        # Ограничитель срабатывает до проверки данных: 400 значит,
+        # что запрос прошел и списал стоимость создания.
+        return self.client.post(URL, {}, format='json')
+
+    def assert_rate_limit(self, response, limit, remaining, reset):
+        self.assertEqual(response['RateLimit-Limit'], str(limit))
+        self.assertEqual(response['RateLimit-Remaining'], str(remaining))
+        self.assertEqual(response['RateLimit-Reset'], str(reset))
+
+    def test_headers_show_remaining_tokens(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assert_rate_limit(response, 20, 19, 3)
+
+    def test_create_costs_ten_tokens(self):
+        response = self.create()
+        self.assertEqual(response.status_code, 400)
+        self.assert_rate_limit(response, 20, 10, 30)
+        self.assert_rate_limit(self.client.get(URL), 20, 9, 33)
+
+    def test_exhausted_bucket_returns_retry_after(self):
+        self.assertEqual(self.create().status_code, 400)
+        self.client.get(URL)
+        response = self.create()
+        self.assertEqual(response.status_code, 429)
+        # Не хватает одного токена из десяти.
+        self.assertEqual(response['Retry-After'], '3')
+        self.assert_rate_limit(response, 20, 9, 33)
+
+    def test_bucket_refills_over_time(self):
+        self.create()
+        self.create()
+        self.assertEqual(self.create().status_code, 429)
+        self.now += 27
+        self.assertEqual(self.create().status_code, 429)
+        self.now += 3
+        response = self.create()
+        self.assertEqual(response.status_code, 400)
+        self.assert_rate_limit(response, 20, 0, 60)
+
+    def test_bucket_does_not_exceed_capacity(self):
+        self.client.get(URL)
+        self.now += 3600
+        self.assert_rate_limit(self.client.get(URL), 20, 19, 3)
+
+    def test_scopes_have_separate_buckets(self):
+        self.assertEqual(self.client.get('/api/tags/').status_code, 200)
+        self.assertEqual(self.client.get('/api/tags/').status_code, 429)
+        self.assertEqual(self.client.get(URL).status_code, 200)
@@ -0,0 +1,119 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .base import APITestCase
+from recipes.deletion import hide_recipe
+from recipes.models import Subscription, TimelineEntry
+from recipes.timeline import get_feed_entries
+
+
+class TimelineTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.create_user('reader')
+        self.author = self.create_user('author')
+
+    def get_timeline(self, user=None):
+        return set(TimelineEntry.objects.filter(
+            user=user or self.reader
+        ).values_list('recipe_id', flat=True))
+
+    def test_new_recipe_is_fanned_out(self):
+        self.subscribe(self.reader, self.author)
+        recipe = self.create_recipe(self.author)
+        self.assertEqual(self.get_timeline(), {recipe.id})
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_follow_backfills_latest_recipes(self):
+        recipes = [self.create_recipe(self.author, name=f'Рецепт {index}')
+                   for index in range(3)]
+        self.subscribe(self.reader, self.author)
+        self.assertEqual(self.get_timeline(),
+                         {recipe.id for recipe in recipes[1:]})
+
+    def test_unfollow_prunes_timeline(self):
+        other = self.create_user('other')
+        subscription = self.subscribe(self.reader, self.author)
+        self.subscribe(self.reader, other)
+        self.create_recipe(self.author)
+        kept = self.create_recipe(other)
+        subscription.delete()
+        self.assertEqual(self.get_timeline(), {kept.id})
+
+    @override_settings(FEED_FANOUT_FOLLOWER_LIMIT=1)
+    def test_popular_author_is_merged_on_read(self):
+        self.subscribe(self.reader, self.author)
+        recipe = self.create_recipe(self.author)
+        self.assertEqual(self.get_timeline(), set())
+        self.assertEqual(
+            [recipe_id for _, recipe_id in get_feed_entries(self.reader, 10)],
+            [recipe.id]
+        )
+
+    def test_hidden_recipes_do_not_shorten_pages(self):
+        self.subscribe(self.reader, self.author)
+        kept = self.create_recipe(self.author, name='Рецепт 1')
+        hidden = self.create_recipe(self.author, name='Рецепт 2')
+        hide_recipe(hidden)
+        response = self.get_client(self.reader).get(
+            '/api/recipes/feed/', {'limit': 1}
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']], [kept.id]
+        )
+        self.assertIsNone(response.data['next'])
+
+    @override_settings(FEED_FANOUT_FOLLOWER_LIMIT=2)
+    def test_popular_author_stays_merged_after_unfollow(self):
+        other = self.create_user('other')
+        self.subscribe(self.reader, self.author)
+        subscription = self.subscribe(other, self.author)
+        recipe = self.create_recipe(self.author)
+        subscription.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertTrue(self.author.fanout_disabled)
+        self.assertEqual(
+            [recipe_id for _, recipe_id in get_feed_entries(self.reader, 10)],
+            [recipe.id]
+        )
+
+    def count_feed_queries(self, limit):
+        client = self.get_client(self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/recipes/feed/', {'limit': limit})
+        self.assertEqual(len(response.data['results']), limit)
+        return len(queries)
+
+    def test_feed_queries_do_not_grow_with_limit(self):
+        self.subscribe(self.reader, self.author)
+        for index in range(6):
+            self.create_recipe(self.author, name=f'Рецепт {index}')
+        # Первый запрос собирает документы и кэширует id избранного.
+        self.count_feed_queries(6)
+        self.assertEqual(self.count_feed_queries(2),
+                         self.count_feed_queries(6))
+
+    def test_rebuild_restores_timelines(self):
+        self.subscribe(self.reader, self.author)
+        recipe = self.create_recipe(self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=io.StringIO())
+        self.assertEqual(self.get_timeline(), {recipe.id})
+
+    def test_failed_rebuild_keeps_timelines(self):
+        self.subscribe(self.reader, self.author)
+        recipe = self.create_recipe(self.author)
+        Subscription.objects.create(user=self.author, author=self.reader)
+        with mock.patch(
+            'recipes.management.commands.rebuild_timelines.backfill_timeline',
+            side_effect=[None, RuntimeError]
+        ), self.assertRaises(RuntimeError):
+            call_command('rebuild_timelines', stdout=io.StringIO())
+        self.assertEqual(self.get_timeline(), {recipe.id})
@@ -0,0 +1,55 @@
+from .base import APITestCase
+
+PAGE_SIZES = (1, 5, 20)
+
+
+class UserListQueryTests(APITestCase):
+    """Число запросов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_user('reader')
+        for index in range(25):
+            author = cls.create_user(f'author{index}')
+            for number in range(3):
+                cls.create_recipe(cls, author, name=f'Рецепт {number}')
+            if index % 6:
+                cls.subscribe(cls.user, author)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.get_client()
+        self.client.force_authenticate(self.user)
+
+    def test_users(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                # count и страница с аннотацией is_subscribed.
+                with self.assertNumQueries(2):
+                    response = self.client.get(f'/api/users/?limit={limit}')
+                self.assertEqual(len(response.data['results']), limit)
+                self.assertEqual(
+                    {user['id'] for user in response.data['results']
+                     if user['is_subscribed']},
+                    set(self.user.sub_user.filter(
+                        author_id__in=[
+                            user['id'] for user in response.data['results']
+                        ]
+                    ).values_list('author_id', flat=True))
+                )
+
+    def test_subscriptions(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                # count, страница с авторами и рецепты авторов.
+                with self.assertNumQueries(3):
+                    response = self.client.get(
+                        f'/api/users/subscriptions/?limit={limit}'
+                        '&recipes_limit=2'
+                    )
+                results = response.data['results']
+                self.assertEqual(len(results), limit)
+                for author in results:
+                    self.assertEqual(author['recipes_count'], 3)
+                    self.assertEqual(len(author['recipes']), 2)
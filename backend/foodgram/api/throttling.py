@@ -0,0 +1,125 @@
+import math
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from foodgram.middleware import HybridMiddleware
+
+DEFAULT_SCOPE = 'default'
+
+
+def get_throttle_scope(view):
+    return getattr(view, 'throttle_scope', None) or DEFAULT_SCOPE
+
+
+def get_throttle_cost(view):
+    """Стоимость запроса в токенах: throttle_costs[action] или 1."""
+    costs = getattr(view, 'throttle_costs', None) or {}
+    return costs.get(getattr(view, 'action', None), 1)
+
+
+def set_rate_limit(request, limit, remaining, reset):
+    """
+    Запоминает в HttpRequest самое строгое из проверенных ограничений
+    для заголовков RateLimit-*.
+    """
+    request = getattr(request, '_request', request)
+    current = getattr(request, 'rate_limit', None)
+    if current is None or remaining < current[1]:
+        request.rate_limit = (limit, remaining, reset)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ведро токенов в кэше Django. Ведро вмещает num_requests токенов
+    и равномерно наполняется за period; запрос расходует стоимость
+    действия, поэтому тяжелые эндпоинты исчерпывают его быстрее.
+    Ведра раздельные для каждого throttle_scope представления.
+    Скорость берется из DEFAULT_THROTTLE_RATES по ключу
+    '<kind>.<scope>', иначе '<kind>'; без скорости запрос не ограничен.
+    Как и в SimpleRateThrottle, чтение и запись ведра не атомарны.
+    """
+    kind = None
+    cache_format = 'throttle:%(kind)s:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_scope_rate(self, scope):
+        return self.THROTTLE_RATES.get(
+            f'{self.kind}.{scope}', self.THROTTLE_RATES.get(self.kind)
+        )
+
+    def allow_request(self, request, view):
+        self.scope = get_throttle_scope(view)
+        rate = self.get_scope_rate(self.scope)
+        if rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        capacity, duration = self.parse_rate(rate)
+        refill = capacity / duration
+        cost = min(get_throttle_cost(view), capacity)
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+            self.wait_time = None
+        else:
+            self.wait_time = (cost - tokens) / refill
+        self.cache.set(self.key, (tokens, now), duration)
+        set_rate_limit(
+            request, capacity, math.floor(tokens),
+            math.ceil((capacity - tokens) / refill)
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Ограничение для аутентифицированных пользователей по id."""
+    kind = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'kind': self.kind,
+            'scope': self.scope,
+            'ident': request.user.pk,
+        }
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """Ограничение для анонимных клиентов по IP-адресу."""
+    kind = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'kind': self.kind,
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class RateLimitHeadersMiddleware(HybridMiddleware):
+    """
+    Добавляет к ответу заголовки RateLimit-Limit, RateLimit-Remaining
+    и RateLimit-Reset (секунды до полного ведра), если запрос прошел
+    через ограничители.
+    """
+
+    def process_response(self, request, response):
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            limit, remaining, reset = rate_limit
+            response['RateLimit-Limit'] = str(limit)
+            response['RateLimit-Remaining'] = str(remaining)
+            response['RateLimit-Reset'] = str(reset)
+        return response
@@ -1,8 +1,9 @@
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from . import async_views
+from .views import (ChangeViewSet, CustomUserViewSet, IngredientViewSet,
+                    RecipeViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -11,9 +12,19 @@ router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipe')
 router.register('users', CustomUserViewSet, basename='users')
+router.register('changes', ChangeViewSet, basename='changes')
 
 
+async_urlpatterns = [
+    path('recipes/', async_views.recipe_list),
+    path('recipes/<int:pk>/', async_views.recipe_detail),
+    path('tags/', async_views.tag_list),
+    path('ingredients/', async_views.ingredient_list),
+    path('users/subscriptions/', async_views.subscription_list),
+]
+
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
     re_path(r'auth/', include('djoser.urls.authtoken')),
 ]
@@ -21,7 +21,7 @@ def create_pdf_shopping_cart(user):
     pdf_page.setFont('TimesNewRoman', 14)
     x, y = 50, 690
     purchases = RecipeIngredientAmount.objects.filter(
-        recipe__shopping_cart__user=user
+        recipe__shopping_cart__user=user, recipe__deleted_at__isnull=True
     ).values('ingredient__name', 'ingredient__measurement_unit').annotate(
         total_amount=Sum('amount')
     )
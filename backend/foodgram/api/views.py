@@ -1,43 +1,139 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
 from django.core.exceptions import PermissionDenied
-from django.http import FileResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .changes import serialize_changes
+from .documents import rebuild_documents, render_documents
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPageNumberPagination
+from .idempotency import idempotent
+from .pagination import CustomPageNumberPagination, FeedKeysetPagination
 from .permissions import IsAdminOrReadOnly, IsOwnerAdminOrReadOnly
-from .serializers import (CustomUserReadSerializer,
+from .serializers import (BatchIdsSerializer, CustomUserReadSerializer,
                           CustomUserSetPasswordSerializer,
                           CustomUserWriteSerializer, IngredientSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
                           ShortRecipeSerializer, SubscribeSerializer,
-                          SubscriptionSerializer, TagSerializer)
+                          SubscriptionSerializer, TagSerializer,
+                          get_sparse_params, is_sideload)
+from .sideload import get_recipe_included, get_subscription_included
 from .utils import create_pdf_shopping_cart
-from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+from recipes.batch import delete_memberships, delete_subscriptions
+from recipes.changes import (get_sequence, get_user_changes,
+                             is_history_pruned, log_changes)
+from recipes.deletion import hide_recipe, hide_user
+from recipes.export import spool_export, stream_export
+from recipes.facets import get_tag_facets
+from recipes.ingredient_index import ingredient_index
+from recipes.membership import (FAVORITE, SHOPPING_CART,
+                                invalidate_recipe_ids)
+from recipes.models import (Change, Favorite, Ingredient, Recipe,
+                            RecipeIngredientAmount, ShoppingCart,
                             Subscription, Tag)
+from recipes.scores import favorites_bulk_added
+from recipes.similarity import update_similar_recipes
+from recipes.timeline import (backfill_timeline, followers_changed,
+                              get_feed_entries)
 from users.models import CustomUser
 
 User = get_user_model()
 
+BATCH_CREATED = 'created'
+BATCH_EXISTS = 'exists'
+BATCH_NOT_FOUND = 'not_found'
+BATCH_DELETED = 'deleted'
+BATCH_ABSENT = 'absent'
+BATCH_SELF = 'self'
+
 KEYBOARD_LAYOUT = str.maketrans(
     'qwertyuiop[]asdfghjkl;\'zxcvbnm,./',
     'йцукенгшщзхъфывапролджэячсмитьбю.'
 )
 
 
+def annotate_is_subscribed(queryset, user):
+    if not user.is_authenticated:
+        return queryset
+    return queryset.annotate(is_subscribed=Exists(
+        Subscription.objects.filter(user=user, author=OuterRef('pk'))
+    ))
+
+
+def get_int_params(request, *names):
+    try:
+        return [
+            int(value) if value else None
+            for value in map(request.query_params.get, names)
+        ]
+    except ValueError:
+        raise ValidationError(
+            {'detail': f'Параметры {", ".join(names)} - целые числа.'}
+        )
+
+
+def lock_user(user):
+    """
+    Блокирует строку пользователя до конца транзакции. Изменения его
+    избранного, корзины и подписок выполняются по очереди, поэтому
+    пакетная операция видит в базе только свои вставки.
+    """
+    CustomUser.objects.select_for_update().only('id').get(pk=user.pk)
+
+
+def bulk_insert(queryset, objs, field):
+    """
+    Вставляет objs с ignore_conflicts и возвращает значения field
+    вставленных строк queryset. Вызывается под lock_user, поэтому
+    конкурентный запрос не может вставить те же строки: среди objs
+    только отсутствовавшие до вставки.
+    """
+    model = queryset.model
+    model.objects.bulk_create(objs, ignore_conflicts=True)
+    attname = model._meta.get_field(field).attname
+    return set(queryset.filter(**{
+        f'{attname}__in': [getattr(obj, attname) for obj in objs]
+    }).values_list(attname, flat=True))
+
+
+def get_batch_ids(request):
+    serializer = BatchIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data['ids']
+
+
+def batch_response(ids, get_status):
+    """Ответ пакетной операции: итог по каждому id и число изменений."""
+    results = [{'id': pk, 'status': get_status(pk)} for pk in ids]
+    return Response({
+        'created': sum(
+            result['status'] == BATCH_CREATED for result in results
+        ),
+        'deleted': sum(
+            result['status'] == BATCH_DELETED for result in results
+        ),
+        'results': results,
+    })
+
+
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """ Работа с тэгами. """
     permission_classes = (IsAdminOrReadOnly,)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    throttle_scope = 'tags'
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -46,10 +142,62 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     serializer_class = IngredientSerializer
     pagination_class = None
+    throttle_scope = 'ingredients'
+    throttle_costs = {'list': 5}
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
 
 
+def get_subscription_queryset(user):
+    """Подписки на видимых авторов с их рецептами одним запросом."""
+    return Subscription.objects.filter(
+        user=user, author__deleted_at__isnull=True
+    ).select_related('author').prefetch_related(Prefetch(
+        'author__recipes',
+        queryset=Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time', 'author_id'
+        ),
+        to_attr='visible_recipes'
+    )).order_by('id')
+
+
+def get_recipe_queryset(request):
+    """
+    Рецепты для чтения: загружает только то, что попадет в ответ
+    с учетом ?fields= и ?expand=.
+    """
+    queryset = Recipe.objects.all()
+    requested, expand = get_sparse_params(request)
+    sparse = requested is not None or expand is not None
+
+    def needed(name):
+        return requested is None or name in requested
+
+    def expanded(name):
+        return needed(name) and (not sparse or name in (expand or ()))
+
+    if not needed('text'):
+        queryset = queryset.defer('text')
+    if expanded('author'):
+        queryset = queryset.prefetch_related(Prefetch(
+            'author', queryset=annotate_is_subscribed(
+                CustomUser.objects.all(), request.user
+            )
+        ))
+    if needed('tags'):
+        queryset = queryset.prefetch_related('tags')
+    if expanded('ingredients'):
+        queryset = queryset.prefetch_related(Prefetch(
+            'recipe',
+            queryset=RecipeIngredientAmount.objects.select_related(
+                'ingredient'
+            )
+        ))
+    elif needed('ingredients'):
+        queryset = queryset.prefetch_related('recipe')
+    return queryset
+
+
 class CustomUserViewSet(UserViewSet):
     """
     Реализация работы с пользователями и подписками.
@@ -59,6 +207,7 @@ class CustomUserViewSet(UserViewSet):
             api/users/me/
             api/users/{user_id}/
             api/users/subscriptions/
+            api/users/me/export/
         POST:
             api/users/
             api/auth/token/login/
@@ -67,10 +216,13 @@ class CustomUserViewSet(UserViewSet):
     """
 
     pagination_class = CustomPageNumberPagination
+    throttle_scope = 'users'
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return CustomUserReadSerializer
+        if self.request.method == 'DELETE':
+            return super().get_serializer_class()
         return CustomUserWriteSerializer
 
     def perform_create(self, serializer):
@@ -78,8 +230,15 @@ class CustomUserViewSet(UserViewSet):
             password = make_password(self.request.data['password'])
             serializer.save(password=password)
 
+    def perform_destroy(self, instance):
+        hide_user(instance)
+
     def get_queryset(self):
-        return CustomUser.objects.all()
+        queryset = CustomUser.objects.filter(deleted_at__isnull=True)
+        requested, _ = get_sparse_params(self.request)
+        if requested is None or 'is_subscribed' in requested:
+            queryset = annotate_is_subscribed(queryset, self.request.user)
+        return queryset
 
     @action(
         detail=False,
@@ -113,13 +272,96 @@ class CustomUserViewSet(UserViewSet):
         Эндпоинт подписчики
         GET: api/users/subscriptions
         """
-        user = self.request.user
-        queryset = Subscription.objects.filter(user=user)
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(
+            get_subscription_queryset(request.user)
+        )
         serializer = SubscriptionSerializer(
             page, many=True, context={'request': request}
         )
-        return self.get_paginated_response(serializer.data)
+        response = self.get_paginated_response(serializer.data)
+        if is_sideload(request):
+            response.data['included'] = get_subscription_included(
+                serializer.data, request
+            )
+        return response
+
+    @action(
+        detail=False,
+        url_path='me/export',
+        permission_classes=(IsAuthenticated,),
+        url_name='export',
+        throttle_scope='export'
+    )
+    def export(self, request):
+        """
+        Эндпоинт выгрузки данных пользователя в JSON Lines
+        GET: api/users/me/export/?gzip=1
+        """
+        compressed = request.query_params.get('gzip') in ('1', 'true')
+        filename = f'{request.user.username}_export.jsonl'
+        content_type = 'application/x-ndjson; charset=utf-8'
+        if compressed:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        if isinstance(request._request, ASGIRequest):
+            response = FileResponse(
+                spool_export(request.user, compressed),
+                content_type=content_type
+            )
+        else:
+            response = StreamingHttpResponse(
+                stream_export(request.user, compressed),
+                content_type=content_type
+            )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        permission_classes=(IsAuthenticated,),
+        url_name='subscribe_batch'
+    )
+    @idempotent
+    @transaction.atomic
+    def subscribe_batch(self, request):
+        """
+        Эндпоинт пакетной подписки и отписки
+        POST, DELETE: api/users/subscribe_batch/ {"ids": [...]}
+        """
+        user = request.user
+        ids = get_batch_ids(request)
+        lock_user(user)
+        present = set(user.sub_user.filter(
+            author_id__in=ids
+        ).values_list('author_id', flat=True))
+        if request.method == 'DELETE':
+            delete_subscriptions(user.id, present)
+            return batch_response(
+                ids,
+                lambda pk: BATCH_DELETED if pk in present else BATCH_ABSENT
+            )
+        found = set(CustomUser.objects.filter(
+            id__in=ids, deleted_at__isnull=True
+        ).values_list('id', flat=True))
+        candidates = [
+            pk for pk in ids
+            if pk in found and pk != user.id and pk not in present
+        ]
+        inserted = bulk_insert(user.sub_user.all(), [
+            Subscription(user=user, author_id=pk) for pk in candidates
+        ], 'author')
+        created = [pk for pk in candidates if pk in inserted]
+        log_changes(Change.SUBSCRIPTION, created, user_id=user.id)
+        followers_changed(created, 1)
+        for author_id in created:
+            backfill_timeline(user.id, author_id)
+        return batch_response(ids, lambda pk: (
+            BATCH_NOT_FOUND if pk not in found
+            else BATCH_SELF if pk == user.id
+            else BATCH_CREATED if pk in inserted
+            else BATCH_EXISTS
+        ))
 
     @action(
         detail=True,
@@ -127,13 +369,18 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,),
         url_name='subscribe'
     )
+    @idempotent
+    @transaction.atomic
     def subscribe(self, request, id):
         """
         Эндпоинт довбовление, удаление подписки
         POST, DELETE: api/users/<user_id>/subscribe/
         """
         user = request.user
-        author = get_object_or_404(CustomUser, pk=id)
+        author = get_object_or_404(
+            CustomUser, pk=id, deleted_at__isnull=True
+        )
+        lock_user(user)
         subscription = user.sub_user.filter(author=author)
         if request.method == 'POST':
             serializer = SubscribeSerializer(
@@ -162,6 +409,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     """
     Эндпоинт работает с рецептами
     GET, POST: /api/recipes/
+    GET: /api/recipes/?ids=1,2,3
+    GET: /api/recipes/?facets=tags
     GEt, PATCH, DELETE: /api/recipes/{id}/
     """
     queryset = Recipe.objects.all()
@@ -169,23 +418,129 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = CustomPageNumberPagination
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
+    throttle_scope = 'recipes'
+    throttle_costs = {'create': 10, 'update': 10, 'partial_update': 10}
+
+    def get_queryset(self):
+        if self.request.method != 'GET':
+            return Recipe.objects.all()
+        return get_recipe_queryset(self.request)
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            response = self.list_by_ids(request)
+        else:
+            if self.use_documents(request):
+                response = self.list_documents(request)
+            else:
+                response = super().list(request, *args, **kwargs)
+            if 'tags' in request.query_params.getlist('facets'):
+                response.data['facets'] = {
+                    'tags': self.get_tag_facets(request)
+                }
+        if is_sideload(request):
+            response.data['included'] = get_recipe_included(
+                response.data['results'], request,
+                lambda users: annotate_is_subscribed(users, request.user)
+            )
+        return response
+
+    def use_documents(self, request):
+        """
+        Полный ответ без ?fields=, ?expand= и ?sideload= собирается
+        из RecipeDocument.
+        """
+        return get_sparse_params(request) == (None, None)
+
+    def list_documents(self, request):
+        queryset = self.filter_queryset(Recipe.objects.all())
+        page = self.paginate_queryset(queryset.values_list('id', flat=True))
+        return self.get_paginated_response(
+            render_documents(list(page), request)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_documents(request):
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            results = render_documents([int(kwargs['pk'])], request)
+        except ValueError:
+            raise Http404
+        if not results:
+            raise Http404
+        return Response(results[0])
+
+    def get_tag_facets(self, request):
+        """Счетчики тегов с учетом всех фильтров, кроме самих тегов."""
+        params = request.query_params.copy()
+        params.pop('tags', None)
+        filterset = self.filterset_class(
+            params, queryset=Recipe.objects.all(), request=request
+        )
+        filtered = any(
+            value for name in filterset.filters
+            for value in params.getlist(name)
+        )
+        return get_tag_facets(filterset.qs, cacheable=not filtered)
+
+    def list_by_ids(self, request):
+        """
+        Рецепты по списку id в порядке запроса, без фильтров и пагинации
+        GET: api/recipes/?ids=1,2,3
+        """
+        serializer = BatchIdsSerializer(data={'ids': [
+            value for value in request.query_params['ids'].split(',')
+            if value.strip()
+        ]})
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if self.use_documents(request):
+            results = render_documents(ids, request)
+            found = {result['id'] for result in results}
+        else:
+            recipes = self.get_queryset().in_bulk(ids)
+            results = self.get_serializer(
+                [recipes[pk] for pk in ids if pk in recipes], many=True
+            ).data
+            found = recipes
+        return Response({
+            'results': results,
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        rebuild_documents([serializer.instance.id])
+        update_similar_recipes(serializer.instance.id)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        hide_recipe(instance)
+
+    @transaction.atomic
     def perform_update(self, serializer):
         if serializer.instance.author != self.request.user:
             raise PermissionDenied('Изменение чужого контента запрещено!')
         super().perform_update(serializer)
+        rebuild_documents([serializer.instance.id])
+        if 'ingredients' in serializer.validated_data:
+            update_similar_recipes(serializer.instance.id)
 
+    @transaction.atomic
     def control_existence_recipe(self, model, pk, request):
         recipe = get_object_or_404(Recipe, pk=pk)
         user = request.user
+        lock_user(user)
         queryset = model.objects.filter(user=user, recipe=recipe)
         if request.method == 'POST':
             if queryset.exists():
@@ -208,10 +563,167 @@ class RecipeViewSet(viewsets.ModelViewSet):
             queryset.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @transaction.atomic
+    def control_existence_batch(self, model, request):
+        user = request.user
+        ids = get_batch_ids(request)
+        lock_user(user)
+        present = set(model.objects.filter(
+            user=user, recipe_id__in=ids
+        ).values_list('recipe_id', flat=True))
+        if request.method == 'DELETE':
+            delete_memberships(
+                FAVORITE if model is Favorite else SHOPPING_CART,
+                user.id, present
+            )
+            return batch_response(
+                ids,
+                lambda pk: BATCH_DELETED if pk in present else BATCH_ABSENT
+            )
+        found = set(Recipe.objects.filter(
+            id__in=ids
+        ).values_list('id', flat=True))
+        candidates = [pk for pk in ids if pk in found and pk not in present]
+        inserted_ids = bulk_insert(model.objects.filter(user=user), [
+            model(user=user, recipe_id=pk) for pk in candidates
+        ], 'recipe')
+        created = [pk for pk in candidates if pk in inserted_ids]
+        if created:
+            invalidate_recipe_ids(
+                FAVORITE if model is Favorite else SHOPPING_CART, user.id
+            )
+        if model is Favorite and created:
+            favorites_bulk_added(Favorite.objects.filter(
+                user=user, recipe_id__in=created
+            ))
+        log_changes(
+            Change.FAVORITE if model is Favorite else Change.SHOPPING_CART,
+            created, user_id=user.id
+        )
+        return batch_response(ids, lambda pk: (
+            BATCH_NOT_FOUND if pk not in found
+            else BATCH_CREATED if pk in inserted_ids
+            else BATCH_EXISTS
+        ))
+
     @action(
         detail=False,
+        methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,),
-        url_name='download_recipe'
+        url_name='favorite_batch'
+    )
+    @idempotent
+    def favorite_batch(self, request):
+        """
+        Эндпоинт пакетного добавления и удаления избранного
+        POST, DELETE: api/recipes/favorite_batch/ {"ids": [...]}
+        """
+        return self.control_existence_batch(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        permission_classes=(IsAuthenticated,),
+        url_name='shopping_cart_batch'
+    )
+    @idempotent
+    def shopping_cart_batch(self, request):
+        """
+        Эндпоинт пакетного добавления и удаления из корзины
+        POST, DELETE: api/recipes/shopping_cart_batch/ {"ids": [...]}
+        """
+        return self.control_existence_batch(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_name='feed'
+    )
+    def feed(self, request):
+        """
+        Эндпоинт ленты рецептов авторов из подписок
+        GET: api/recipes/feed/?limit=&cursor=
+        """
+        paginator = FeedKeysetPagination()
+        limit = paginator.get_limit(request)
+        entries = paginator.paginate_entries(
+            get_feed_entries(
+                request.user, limit, paginator.decode_cursor(request)
+            ),
+            limit, request
+        )
+        ids = [recipe_id for _, recipe_id in entries]
+        if self.use_documents(request):
+            results = render_documents(ids, request)
+        else:
+            recipes = get_recipe_queryset(request).in_bulk(ids)
+            results = RecipeReadSerializer(
+                [recipes[pk] for pk in ids if pk in recipes],
+                many=True, context={'request': request}
+            ).data
+        return paginator.get_paginated_response(results)
+
+    @action(detail=False, url_name='from_ingredients')
+    def from_ingredients(self, request):
+        """
+        Эндпоинт подбора рецептов по имеющимся ингредиентам
+        GET: api/recipes/from_ingredients/?ingredients=1&ingredients=2
+             &tags=&cooking_time_min=&cooking_time_max=
+        """
+        try:
+            ingredient_ids = [
+                int(value)
+                for value in request.query_params.getlist('ingredients')
+            ]
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Ожидаются id ингредиентов.'}
+            )
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Укажите ингредиенты.'})
+        cooking_time_min, cooking_time_max = get_int_params(
+            request, 'cooking_time_min', 'cooking_time_max'
+        )
+        results = ingredient_index.search(
+            ingredient_ids,
+            tags=request.query_params.getlist('tags'),
+            cooking_time_min=cooking_time_min,
+            cooking_time_max=cooking_time_max
+        )
+        page = self.paginate_queryset(results)
+        recipes = Recipe.objects.in_bulk([item['id'] for item in page])
+        data = []
+        for item in page:
+            if item['id'] not in recipes:
+                continue
+            data.append({
+                **ShortRecipeSerializer(
+                    recipes[item['id']], context={'request': request}
+                ).data,
+                **item
+            })
+        return self.get_paginated_response(data)
+
+    @action(detail=True, url_name='similar')
+    def similar(self, request, pk):
+        """
+        Эндпоинт похожих рецептов
+        GET: api/recipes/<recipe_id>/similar/
+        """
+        recipe = self.get_object()
+        queryset = Recipe.objects.filter(
+            similar_to__recipe=recipe
+        ).order_by('-similar_to__score')
+        serializer = ShortRecipeSerializer(
+            queryset, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_name='download_recipe',
+        throttle_scope='shopping_cart_download'
     )
     def download_shopping_cart(self, request):
         """
@@ -233,6 +745,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
         url_name='favorite'
     )
+    @idempotent
     def favorite(self, request, pk):
         """
         Эндпоинт добовления в избраное
@@ -249,6 +762,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
         url_name='shopping_cart'
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         """
         Эндпоинт добовления в корзину.
@@ -258,3 +772,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.control_existence_recipe(
             model, pk, request
         )
+
+
+class ChangeViewSet(viewsets.ViewSet):
+    """
+    Эндпоинт журнала изменений для дельта-синхронизации
+    GET: /api/changes/?since=<seq>&limit=
+    """
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'changes'
+
+    def list(self, request):
+        since, limit = get_int_params(request, 'since', 'limit')
+        since = since or 0
+        if limit is not None and limit < 1:
+            raise ValidationError({'limit': 'Ожидается число больше 0.'})
+        limit = min(limit or settings.CHANGES_PAGE_SIZE,
+                    settings.CHANGES_MAX_PAGE_SIZE)
+        if is_history_pruned(since):
+            return Response({
+                'reset': True,
+                'next': get_sequence().last,
+            }, status=status.HTTP_410_GONE)
+        changes = get_user_changes(request.user, since, limit + 1)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return Response({
+            'next': changes[-1].sequence if changes else since,
+            'has_more': has_more,
+            'changes': serialize_changes(changes, request),
+        })
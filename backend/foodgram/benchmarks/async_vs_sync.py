@@ -0,0 +1,75 @@
+"""
+Сравнение синхронных и асинхронных эндпоинтов чтения.
+
+Запускается против работающего сервера, например:
+    SERVER_INTERFACE=asgi gunicorn --config gunicorn.conf.py
+    python benchmarks/async_vs_sync.py --base-url http://127.0.0.1:8000
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ENDPOINTS = (
+    ('recipes', '/api/recipes/', '/api/async/recipes/'),
+    ('tags', '/api/tags/', '/api/async/tags/'),
+    ('ingredients', '/api/ingredients/', '/api/async/ingredients/'),
+    ('subscriptions', '/api/users/subscriptions/',
+     '/api/async/users/subscriptions/'),
+)
+
+
+def fetch(session, url, headers):
+    start = time.perf_counter()
+    response = session.get(url, headers=headers)
+    return time.perf_counter() - start, response.status_code
+
+
+def run(url, total, concurrency, headers):
+    session = requests.Session()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda _: fetch(session, url, headers), range(total)
+        ))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, code in results if code >= 400)
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--token', help='Токен для эндпоинтов с авторизацией')
+    args = parser.parse_args()
+    headers = {}
+    if args.token:
+        headers['Authorization'] = f'Token {args.token}'
+
+    row = '{:<14} {:<6} {:>9} {:>9} {:>9} {:>7}'
+    print(row.format(
+        'endpoint', 'mode', 'req/s', 'p50 ms', 'p95 ms', 'errors'
+    ))
+    for name, sync_path, async_path in ENDPOINTS:
+        for mode, path in (('sync', sync_path), ('async', async_path)):
+            result = run(
+                args.base_url + path, args.requests, args.concurrency, headers
+            )
+            print(row.format(
+                name, mode, f'{result["rps"]:.1f}', f'{result["p50"]:.1f}',
+                f'{result["p95"]:.1f}', result['errors']
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Сравнение размеров ответа во вложенном формате и в режиме ?sideload=1.
+
+Запускается против работающего сервера с данными, например:
+    python benchmarks/payload_size.py --base-url http://127.0.0.1:8000 \\
+        --token <token>
+"""
+import argparse
+import gzip
+
+import requests
+
+ENDPOINTS = (
+    ('recipes', '/api/recipes/'),
+    ('favorites', '/api/recipes/?is_favorited=1'),
+    ('subscriptions', '/api/users/subscriptions/'),
+)
+
+
+def measure(url, headers):
+    response = requests.get(url, headers=headers)
+    response.raise_for_status()
+    return len(response.content), len(gzip.compress(response.content))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--token', help='Токен для эндпоинтов с авторизацией')
+    args = parser.parse_args()
+    headers = {}
+    if args.token:
+        headers['Authorization'] = f'Token {args.token}'
+
+    row = '{:<14} {:>10} {:>10} {:>10} {:>10} {:>7}'
+    print(row.format(
+        'endpoint', 'nested', 'sideload', 'nested.gz', 'sideload.gz', 'ratio'
+    ))
+    for name, path in ENDPOINTS:
+        separator = '&' if '?' in path else '?'
+        url = f'{args.base_url}{path}{separator}limit={args.limit}'
+        nested, nested_gz = measure(url, headers)
+        sideload, sideload_gz = measure(f'{url}&sideload=1', headers)
+        print(row.format(
+            name, nested, sideload, nested_gz, sideload_gz,
+            f'{sideload / nested:.2f}'
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .middleware import HybridMiddleware
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+# Для однажды сжатых записей кэша берем максимальную степень сжатия.
+PRECOMPRESS_LEVEL = 9
+
+
+def accepts_gzip(request):
+    return bool(ACCEPTS_GZIP.search(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    ))
+
+
+def is_compressible(response):
+    """Проверяет порог размера и список разрешенных типов содержимого."""
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if len(response.content) < settings.COMPRESS_MIN_SIZE:
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return content_type in settings.COMPRESS_CONTENT_TYPES
+
+
+def compress(content, level=PRECOMPRESS_LEVEL):
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def set_compressed_content(response, compressed):
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    response['Content-Encoding'] = 'gzip'
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """
+    Сжимает ответы gzip, если клиент это поддерживает. Готовый сжатый
+    вариант из кэша ответов (атрибут gzip_content) используется как есть.
+    """
+
+    def process_response(self, request, response):
+        if not is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not accepts_gzip(request):
+            return response
+        compressed = getattr(response, 'gzip_content', None)
+        if compressed is None:
+            compressed = compress(
+                response.content, settings.COMPRESS_LEVEL
+            )
+            if len(compressed) >= len(response.content):
+                return response
+        set_compressed_content(response, compressed)
+        return response
@@ -0,0 +1,106 @@
+import hashlib
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .middleware import HybridMiddleware
+
+PRIMARY_DATABASE = 'default'
+STICKY_CACHE_PREFIX = 'db-primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_is_configured():
+    return settings.DATABASE_REPLICA_ALIAS in settings.DATABASES
+
+
+def get_sticky_cache_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return f'{STICKY_CACHE_PREFIX}:{digest}'
+
+
+def is_sticky_to_primary(request):
+    if settings.REPLICA_STICKY_COOKIE in request.COOKIES:
+        return True
+    cache_key = get_sticky_cache_key(request)
+    return cache_key is not None and cache.get(cache_key) is not None
+
+
+def stick_to_primary(request, response):
+    """Направляет чтения клиента на primary после его записи."""
+    timeout = settings.REPLICA_STICKY_SECONDS
+    response.set_cookie(
+        settings.REPLICA_STICKY_COOKIE, '1',
+        max_age=timeout, httponly=True, samesite='Lax'
+    )
+    cache_key = get_sticky_cache_key(request)
+    if cache_key is not None:
+        cache.set(cache_key, True, timeout)
+
+
+class ReplicaStickinessMiddleware(HybridMiddleware):
+    """
+    Разрешает чтение с реплики только для безопасных запросов
+    клиента, который не делал записей последние
+    REPLICA_STICKY_SECONDS секунд.
+    """
+
+    def process_request(self, request):
+        request.use_replica = (
+            request.method in SAFE_METHODS and replica_is_configured()
+            and not is_sticky_to_primary(request)
+        )
+
+    # Переменная контекста задается вокруг вызова представления, а не
+    # в process_request: под ASGI тот выполняется в другом потоке.
+    def call_next(self, request):
+        if self.is_async:
+            return self.acall_next(request)
+        token = _use_replica.set(request.use_replica)
+        try:
+            return self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+    async def acall_next(self, request):
+        token = _use_replica.set(request.use_replica)
+        try:
+            return await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            stick_to_primary(request, response)
+        return response
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтение с реплики внутри разрешенных запросов, остальное - primary.
+    Внутри транзакции на primary читается тоже primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (_use_replica.get()
+                and not connections[PRIMARY_DATABASE].in_atomic_block):
+            return settings.DATABASE_REPLICA_ALIAS
+        return PRIMARY_DATABASE
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.DATABASE_REPLICA_ALIAS:
+            return False
+        return None
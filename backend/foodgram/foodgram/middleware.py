@@ -0,0 +1,53 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+
+class HybridMiddleware:
+    """
+    Промежуточное ПО для WSGI и ASGI. В асинхронной цепочке
+    process_request и process_response выполняются в пуле потоков
+    (thread_sensitive=False): обращения к кэшу и сжатие не занимают
+    цикл событий и не выстраивают запросы в очередь к одному потоку.
+    Состояние для представления, которое должно жить в контексте
+    запроса (contextvars), задается в call_next.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так handler Django распознает экземпляр как асинхронный.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
+
+    def call_next(self, request):
+        """Вызов следующего звена: ответ или, под ASGI, корутина."""
+        return self.get_response(request)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.process_request(request)
+        if response is None:
+            response = self.call_next(request)
+        return self.process_response(request, response)
+
+    async def run_hook(self, hook, *args):
+        if getattr(HybridMiddleware, hook.__name__) is hook.__func__:
+            # Пустой обработчик не стоит перехода в другой поток.
+            return hook(*args)
+        return await sync_to_async(hook, thread_sensitive=False)(*args)
+
+    async def __acall__(self, request):
+        response = await self.run_hook(self.process_request, request)
+        if response is None:
+            response = await self.call_next(request)
+        return await self.run_hook(self.process_response, request, response)
@@ -1,6 +1,8 @@
 import os
+from datetime import datetime, timezone
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -49,8 +51,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'foodgram.db_routers.ReplicaStickinessMiddleware',
+    'api.response_cache.ResponseCacheMiddleware',
+    'api.throttling.RateLimitHeadersMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -88,6 +94,66 @@ DATABASES = {
     }
 }
 
+DATABASE_REPLICA_ALIAS = 'replica'
+
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_routers.PrimaryReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=5))
+
+REPLICA_STICKY_COOKIE = 'db_primary'
+
+# Кэш хранит токены, ведра ограничителей и версии кэшей, поэтому
+# должен быть общим для всех процессов, включая команды manage.py.
+# Промежуточное ПО обращается к нему и в цикле событий ASGI, так что
+# кэш в базе не подходит.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.redis.RedisCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='redis://redis:6379'),
+    }
+}
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+if not DEBUG and CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND must be shared between processes when DEBUG is off'
+    )
+
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default=60))
+
+RESPONSE_CACHE_PREFIXES = ('/api/tags/', '/api/ingredients/', '/api/recipes/')
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=60))
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', default=1024))
+
+COMPRESS_LEVEL = 6
+
+COMPRESS_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/plain',
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -119,20 +185,79 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+SNAPSHOT_ROOT = os.getenv('SNAPSHOT_ROOT', default=os.path.join(BASE_DIR, 'snapshot'))
+
+SNAPSHOT_BASE_URL = os.getenv('SNAPSHOT_BASE_URL', default='http://158.160.19.209')
+
+SNAPSHOT_KEEP_RELEASES = 2
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
     'DEFAULT_PAGINATION_CLASS':
         'api.pagination.CustomPageNumberPagination',
+    # Размер страницы снимка каталога; он же прописан в limit=6
+    # правил map в infra/nginx.conf.
     'PAGE_SIZE': 6,
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.AnonTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.getenv('THROTTLE_USER_RATE', default='600/min'),
+        'anon': os.getenv('THROTTLE_ANON_RATE', default='300/min'),
+        'user.ingredients': '120/min',
+        'anon.ingredients': '60/min',
+        'user.recipes': '300/min',
+        'anon.recipes': '120/min',
+        'user.shopping_cart_download': '20/hour',
+        'user.export': '5/hour',
+    },
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 }
 
+FEED_FANOUT_FOLLOWER_LIMIT = int(
+    os.getenv('FEED_FANOUT_FOLLOWER_LIMIT', default=1000)
+)
+
+FEED_BACKFILL_LIMIT = 100
+
+SIMILAR_RECIPES_COUNT = 10
+
+SIMILAR_RECIPES_METRIC = 'jaccard'
+
+TRENDING_HALF_LIFE_HOURS = int(
+    os.getenv('TRENDING_HALF_LIFE_HOURS', default=72)
+)
+
+# Начальная эпоха весов избранного. Дальше эпоху хранит TrendingEpoch,
+# и refresh_recipe_scores переносит ее на момент пересчета.
+TRENDING_EPOCH = datetime.fromisoformat(
+    os.getenv('TRENDING_EPOCH', default='2022-01-01')
+).replace(tzinfo=timezone.utc)
+
+BATCH_MAX_IDS = 100
+
+CHANGES_PAGE_SIZE = 500
+
+CHANGES_MAX_PAGE_SIZE = 1000
+
+CHANGES_RETENTION_DAYS = int(os.getenv('CHANGES_RETENTION_DAYS', default=30))
+
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 60
+
+TAG_FACETS_CACHE_TIMEOUT = 60 * 5
+
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+EXPORT_CHUNK_SIZE = 2000
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.CustomUserReadSerializer',
@@ -0,0 +1,13 @@
+import os
+
+# SERVER_INTERFACE=asgi запускает приложение через uvicorn-воркеры.
+SERVER_INTERFACE = os.getenv('SERVER_INTERFACE', default='wsgi')
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', default=1))
+
+if SERVER_INTERFACE == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
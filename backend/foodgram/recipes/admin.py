@@ -2,6 +2,7 @@ from django.contrib import admin
 
 from foodgram.settings import EMPTY_VALUE
 
+from .deletion import hide_recipe
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredientAmount,
                      ShoppingCart, Subscription, Tag)
 
@@ -89,6 +90,13 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = (RecipeIngredientInline,)
     empty_value_display = EMPTY_VALUE
 
+    def delete_model(self, request, obj):
+        hide_recipe(obj)
+
+    def delete_queryset(self, request, queryset):
+        for recipe in queryset:
+            hide_recipe(recipe)
+
     @admin.display(description='Игредиенты')
     def get_ingredients(self, obj):
         ingredients = obj.ingredients.all().values_list('name', flat=True)
@@ -101,4 +109,4 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='В избранном')
     def get_count_favorites(self, obj):
-        return obj.favorite_recipes.count()
+        return obj.favorites_count
@@ -0,0 +1,63 @@
+from django.db import transaction
+
+from .changes import log_changes
+from .membership import (FAVORITE, MEMBERSHIP_MODELS, SHOPPING_CART,
+                         invalidate_recipe_ids)
+from .models import Change, Subscription, TimelineEntry
+from .scores import favorites_bulk_removed
+from .timeline import followers_changed
+
+CHANGE_KINDS = {
+    FAVORITE: Change.FAVORITE,
+    SHOPPING_CART: Change.SHOPPING_CART,
+}
+
+
+def delete_rows(queryset):
+    """
+    Удаляет строки одним DELETE, минуя сборщик Django: без загрузки
+    объектов, сигналов и каскадов. Только для моделей, на которые не
+    ссылаются внешние ключи; последствия удаления учитывает вызывающий.
+    """
+    queryset._raw_delete(queryset.db)
+
+
+@transaction.atomic
+def delete_memberships(kind, user_id, recipe_ids):
+    """
+    Удаляет рецепты из избранного или корзины пользователя одним
+    DELETE и пачкой обновляет то, что иначе сделали бы сигналы на
+    каждую строку: счетчики избранного, кэш id и журнал изменений.
+    """
+    if not recipe_ids:
+        return
+    queryset = MEMBERSHIP_MODELS[kind].objects.filter(
+        user_id=user_id, recipe_id__in=recipe_ids
+    )
+    if kind == FAVORITE:
+        favorites = list(queryset.values_list('recipe_id', 'added_date'))
+    delete_rows(queryset)
+    invalidate_recipe_ids(kind, user_id)
+    if kind == FAVORITE:
+        favorites_bulk_removed(favorites)
+    log_changes(CHANGE_KINDS[kind], sorted(recipe_ids), user_id=user_id,
+                deleted=True)
+
+
+@transaction.atomic
+def delete_subscriptions(user_id, author_ids):
+    """
+    Отписывает пользователя от авторов одним DELETE, а ленту,
+    счетчики подписчиков и журнал обновляет пачкой.
+    """
+    if not author_ids:
+        return
+    delete_rows(Subscription.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ))
+    delete_rows(TimelineEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ))
+    followers_changed(author_ids, -1)
+    log_changes(Change.SUBSCRIPTION, sorted(author_ids), user_id=user_id,
+                deleted=True)
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+from django.utils import timezone
+
+from .membership import FAVORITE, SHOPPING_CART, get_recipe_ids
+from .models import Change, ChangeSequence, Recipe, Subscription
+
+SEQUENCE_PK = 1
+
+
+def log_changes(kind, object_ids, user_id=None, author_id=None,
+                deleted=False):
+    """
+    Пишет изменения в транзакции вызывающего кода. Номера им
+    выдаются после ее фиксации.
+    """
+    Change.objects.bulk_create([
+        Change(kind=kind, object_id=object_id, user_id=user_id,
+               author_id=author_id, deleted=deleted)
+        for object_id in object_ids
+    ])
+    transaction.on_commit(sequence_changes)
+
+
+def get_sequence(lock=False):
+    queryset = ChangeSequence.objects
+    if lock:
+        queryset = queryset.select_for_update()
+    sequence, _ = queryset.get_or_create(pk=SEQUENCE_PK)
+    return sequence
+
+
+def sequence_changes():
+    """
+    Нумерует зафиксированные записи журнала. Номера выдаются под
+    блокировкой счетчика и только видимым записям, поэтому запись с
+    большим номером не может стать видимой раньше записи с меньшим,
+    как бы ни завершались транзакции, которые их писали.
+    """
+    pending = Change.objects.filter(sequence__isnull=True)
+    if not pending.exists():
+        return
+    with transaction.atomic():
+        sequence = get_sequence(lock=True)
+        # Запрос после блокировки видит записи, пронумерованные
+        # предыдущим владельцем счетчика.
+        bounds = pending.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return
+        # Номера монотонны по id внутри пачки и больше всех выданных.
+        offset = sequence.last + 1 - bounds['first']
+        pending.filter(
+            id__gte=bounds['first'], id__lte=bounds['last']
+        ).update(sequence=F('id') + offset)
+        sequence.last = bounds['last'] + offset
+        sequence.save(update_fields=('last',))
+
+
+def log_recipe_change(recipe, deleted=False):
+    log_changes(Change.RECIPE, (recipe.id,), author_id=recipe.author_id,
+                deleted=deleted)
+
+
+def log_recipe_changes(recipe_ids):
+    """Изменение рецептов со стороны, например при правке их тега."""
+    Change.objects.bulk_create([
+        Change(kind=Change.RECIPE, object_id=recipe_id, author_id=author_id)
+        for recipe_id, author_id in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', 'author_id')
+    ])
+    transaction.on_commit(sequence_changes)
+
+
+def get_user_changes(user, since, limit):
+    """
+    Изменения после since, касающиеся пользователя: его избранное,
+    корзина и подписки, а также его рецепты, рецепты авторов, на
+    которых он подписан, и рецепты из его избранного и корзины.
+    Отдаются только пронумерованные записи: номер выдается после
+    фиксации, так что клиент, дочитавший до since, не пропустит
+    запись, которая зафиксируется позже.
+    """
+    sequence_changes()
+    recipe_ids = (
+        get_recipe_ids(FAVORITE, user.id)
+        | get_recipe_ids(SHOPPING_CART, user.id)
+    )
+    following = Subscription.objects.filter(user=user).values('author_id')
+    return list(Change.objects.filter(
+        Q(user_id=user.id) | Q(kind=Change.RECIPE) & (
+            Q(author_id=user.id)
+            | Q(author_id__in=following)
+            | Q(object_id__in=recipe_ids)
+        ),
+        sequence__gt=since,
+    ).order_by('sequence')[:limit])
+
+
+def is_history_pruned(since):
+    """Записи после since могли быть удалены prune_changes."""
+    return since < get_sequence().pruned
+
+
+def prune_changes(days):
+    """Удаляет пронумерованные записи старше days дней."""
+    threshold = timezone.now() - timedelta(days=days)
+    with transaction.atomic():
+        sequence = get_sequence(lock=True)
+        pruned = Change.objects.filter(
+            created__lt=threshold, sequence__isnull=False
+        ).aggregate(last=Max('sequence'))['last']
+        if pruned is None:
+            return 0
+        deleted, _ = Change.objects.filter(sequence__lte=pruned).delete()
+        sequence.pruned = max(sequence.pruned, pruned)
+        sequence.save(update_fields=('pruned',))
+    return deleted
@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .changes import log_changes
+from .facets import invalidate_tag_facets
+from .ingredient_index import ingredient_index
+from .models import (Change, Favorite, IdempotencyKey, Recipe,
+                     RecipeDocument, RecipeIngredientAmount, ShoppingCart,
+                     SimilarRecipe, Subscription, TimelineEntry)
+from users.models import CustomUser
+
+RECIPE_DEPENDENTS = (
+    (Favorite, 'recipe'),
+    (ShoppingCart, 'recipe'),
+    (RecipeIngredientAmount, 'recipe'),
+    (Recipe.tags.through, 'recipe'),
+    (TimelineEntry, 'recipe'),
+    (SimilarRecipe, 'recipe'),
+    (SimilarRecipe, 'similar'),
+    (RecipeDocument, 'recipe'),
+)
+
+USER_DEPENDENTS = (
+    (Favorite, 'user'),
+    (ShoppingCart, 'user'),
+    (Subscription, 'user'),
+    (Subscription, 'author'),
+    (TimelineEntry, 'user'),
+    (TimelineEntry, 'author'),
+    (IdempotencyKey, 'user'),
+)
+
+
+def get_hidden_recipes():
+    return Recipe.all_objects.filter(deleted_at__isnull=False)
+
+
+def get_hidden_users():
+    return CustomUser.objects.filter(deleted_at__isnull=False)
+
+
+def remove_similar(recipe_ids):
+    """Убирает скрытые рецепты из списков похожих."""
+    SimilarRecipe.objects.filter(
+        Q(recipe_id__in=recipe_ids) | Q(similar_id__in=recipe_ids)
+    ).delete()
+
+
+def hide_recipe(recipe):
+    """
+    Скрывает рецепт сразу; зависимые записи и сам рецепт удаляет
+    purge_deleted. Сохранение запускает обычные сигналы изменения.
+    """
+    recipe.deleted_at = timezone.now()
+    recipe.save(update_fields=('deleted_at',))
+    remove_similar([recipe.id])
+    invalidate_tag_facets()
+
+
+@transaction.atomic
+def hide_user(user):
+    """Скрывает пользователя вместе с его рецептами и блокирует вход."""
+    now = timezone.now()
+    recipe_ids = list(user.recipes.values_list('id', flat=True))
+    Recipe.objects.filter(id__in=recipe_ids).update(deleted_at=now)
+    RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+    remove_similar(recipe_ids)
+    log_changes(Change.RECIPE, recipe_ids, author_id=user.id, deleted=True)
+    ingredient_index.invalidate()
+    invalidate_tag_facets()
+    user.deleted_at = now
+    user.is_active = False
+    user.save(update_fields=('deleted_at', 'is_active'))
+
+
+def delete_batch(model, field, parents, batch_size):
+    """
+    Удаляет до batch_size записей model, ссылающихся на parents.
+    Сборщик Django загружает в память только эту пачку.
+    """
+    manager = model._base_manager
+    pks = list(manager.filter(
+        **{f'{field}__in': parents.values('id')}
+    ).values_list('pk', flat=True)[:batch_size])
+    if pks:
+        with transaction.atomic():
+            manager.filter(pk__in=pks).delete()
+    return len(pks)
+
+
+def get_purge_steps():
+    """
+    Шаги очистки по порядку: зависимые записи пользователей, затем
+    рецептов, затем сами рецепты и пользователи без рецептов.
+    """
+    hidden_users = get_hidden_users()
+    hidden_recipes = get_hidden_recipes()
+    steps = [(model, field, hidden_users) for model, field in USER_DEPENDENTS]
+    steps += [
+        (model, field, hidden_recipes) for model, field in RECIPE_DEPENDENTS
+    ]
+    steps.append((Recipe, 'id', hidden_recipes))
+    steps.append((CustomUser, 'id', hidden_users.exclude(
+        id__in=Recipe.all_objects.values('author_id')
+    )))
+    return steps
+
+
+def purge_deleted(batch_size, on_batch=None, max_batches=None):
+    """
+    Удаляет скрытые рецепты и пользователей пачками, каждая в своей
+    транзакции. Состояние хранится в базе (deleted_at), поэтому
+    прерванную очистку можно просто запустить снова.
+    """
+    batches = 0
+    for model, field, parents in get_purge_steps():
+        name = model._meta.label if field == 'id' else (
+            f'{model._meta.label}.{field}'
+        )
+        while max_batches is None or batches < max_batches:
+            deleted = delete_batch(model, field, parents, batch_size)
+            if not deleted:
+                break
+            batches += 1
+            if on_batch is not None:
+                on_batch(name, deleted)
+    return batches
@@ -0,0 +1,132 @@
+import json
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (Favorite, Recipe, RecipeIngredientAmount, ShoppingCart,
+                     Subscription)
+from users.models import CustomUser
+
+EXPORT_VERSION = 1
+MANIFEST = 'manifest'
+# Строки склеиваются в блоки, чтобы не отдавать по строке за запись.
+BLOCK_SIZE = 64 * 1024
+
+
+def get_export_sections(user):
+    """Разделы выгрузки: тип строки и queryset словарей."""
+    visible = {'recipe__deleted_at__isnull': True}
+    return (
+        ('user', CustomUser.objects.filter(pk=user.pk).values(
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'date_joined'
+        )),
+        ('recipe', Recipe.objects.filter(author=user).order_by('id').values(
+            'id', 'name', 'text', 'cooking_time', 'image', 'pub_date'
+        )),
+        ('recipe_ingredient', RecipeIngredientAmount.objects.filter(
+            recipe__author=user, **visible
+        ).order_by('recipe_id', 'id').values(
+            'recipe_id', 'amount', name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        )),
+        ('recipe_tag', Recipe.tags.through.objects.filter(
+            recipe__author=user, **visible
+        ).order_by('recipe_id', 'id').values(
+            'recipe_id', slug=F('tag__slug'), name=F('tag__name')
+        )),
+        ('favorite', Favorite.objects.filter(
+            user=user, **visible
+        ).order_by('id').values(
+            'recipe_id', 'added_date', recipe_name=F('recipe__name')
+        )),
+        ('shopping_cart', ShoppingCart.objects.filter(
+            user=user, **visible
+        ).order_by('id').values('recipe_id', recipe_name=F('recipe__name'))),
+        ('subscription', Subscription.objects.filter(
+            user=user, author__deleted_at__isnull=True
+        ).order_by('id').values(
+            'author_id', 'subscribe_date', username=F('author__username')
+        )),
+    )
+
+
+def dump_line(data):
+    return (json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False
+    ) + '\n').encode()
+
+
+def iter_export_lines(user, chunk_size):
+    """
+    Строки JSON Lines с данными пользователя. Каждый раздел читается
+    через iterator(chunk_size), поэтому в памяти не больше одной пачки.
+    Последняя строка - манифест с числом строк по типам; его наличие
+    означает, что выгрузка полная.
+    """
+    image_storage = Recipe._meta.get_field('image').storage
+    counts = {}
+    for kind, queryset in get_export_sections(user):
+        counts[kind] = 0
+        for row in queryset.iterator(chunk_size=chunk_size):
+            if kind == 'recipe' and row['image']:
+                row['image'] = image_storage.url(row['image'])
+            counts[kind] += 1
+            yield dump_line({'type': kind, **row})
+    yield dump_line({
+        'type': MANIFEST,
+        'version': EXPORT_VERSION,
+        'user_id': user.pk,
+        'exported': timezone.now(),
+        'counts': counts,
+    })
+
+
+def iter_blocks(lines, size=BLOCK_SIZE):
+    block = []
+    length = 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield b''.join(block)
+            block = []
+            length = 0
+    if block:
+        yield b''.join(block)
+
+
+def iter_gzip(blocks):
+    compressor = zlib.compressobj(
+        settings.COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(user, compressed=False, chunk_size=None):
+    """Выгрузка блоками байтов, при compressed=True - в формате gzip."""
+    blocks = iter_blocks(iter_export_lines(
+        user, chunk_size or settings.EXPORT_CHUNK_SIZE
+    ))
+    return iter_gzip(blocks) if compressed else blocks
+
+
+def spool_export(user, compressed=False, chunk_size=None):
+    """
+    Выгрузка целиком во временный файл. Под ASGI Django перебирает
+    потоковый ответ в цикле событий, где запросы к базе запрещены,
+    поэтому файл собирается заранее в потоке представления.
+    """
+    file = tempfile.TemporaryFile()
+    for block in stream_export(user, compressed, chunk_size):
+        file.write(block)
+    file.seek(0)
+    return file
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Recipe
+from .tag_slugs import tag_slug_map
+
+TAG_FACETS_KEY = 'tag-facets'
+
+
+def count_tags(queryset):
+    """Число рецептов выборки по каждому тегу одним запросом GROUP BY."""
+    counts = dict(
+        Recipe.tags.through.objects.filter(
+            recipe_id__in=queryset.values('id')
+        ).values('tag_id').annotate(count=Count('recipe_id')).values_list(
+            'tag_id', 'count'
+        )
+    )
+    return {
+        slug: counts.get(tag_id, 0)
+        for slug, tag_id in tag_slug_map.get_map().items()
+    }
+
+
+def get_tag_facets(queryset, cacheable=False):
+    """
+    Счетчики тегов для выборки. Для выборки без фильтров
+    (cacheable=True) ответ одинаков для всех и берется из кэша.
+    """
+    if not cacheable:
+        return count_tags(queryset)
+    facets = cache.get(TAG_FACETS_KEY)
+    if facets is None:
+        facets = count_tags(queryset)
+        cache.set(TAG_FACETS_KEY, facets, settings.TAG_FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def invalidate_tag_facets():
+    cache.delete(TAG_FACETS_KEY)
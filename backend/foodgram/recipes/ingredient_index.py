@@ -0,0 +1,145 @@
+import threading
+import uuid
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Recipe, RecipeIngredientAmount
+
+INDEX_VERSION_KEY = 'ingredient-index-version'
+
+
+def new_version():
+    # Случайная метка, а не счетчик: после сброса кэша счетчик
+    # начался бы заново и совпал с версией устаревшего снимка.
+    return uuid.uuid4().hex
+
+
+def group_positions(pairs, positions):
+    """Собирает отсортированные массивы позиций рецептов по ключу."""
+    postings = {}
+    for recipe_id, key in pairs:
+        position = positions.get(recipe_id)
+        if position is not None:
+            postings.setdefault(key, []).append(position)
+    return {
+        key: np.array(sorted(values), dtype=np.int32)
+        for key, values in postings.items()
+    }
+
+
+class IngredientIndexSnapshot:
+    """Неизменяемый снимок обратного индекса ингредиент -> рецепты."""
+
+    def __init__(self, version):
+        self.version = version
+        recipes = list(
+            Recipe.objects.order_by('id').values_list('id', 'cooking_time')
+        )
+        self.recipe_ids = np.array(
+            [recipe_id for recipe_id, _ in recipes], dtype=np.int64
+        )
+        self.cooking_times = np.array(
+            [cooking_time for _, cooking_time in recipes], dtype=np.int32
+        )
+        positions = {
+            recipe_id: position
+            for position, recipe_id in enumerate(self.recipe_ids.tolist())
+        }
+        self.ingredients = group_positions(
+            RecipeIngredientAmount.objects.values_list(
+                'recipe_id', 'ingredient_id'
+            ),
+            positions
+        )
+        self.tags = group_positions(
+            Recipe.tags.through.objects.values_list(
+                'recipe_id', 'tag__slug'
+            ),
+            positions
+        )
+        self.sizes = np.zeros(len(self.recipe_ids), dtype=np.int32)
+        for recipe_positions in self.ingredients.values():
+            self.sizes[recipe_positions] += 1
+
+    def search(self, ingredient_ids, tags=None, cooking_time_min=None,
+               cooking_time_max=None):
+        """
+        Возвращает рецепты, где есть хотя бы один из ингредиентов,
+        отсортированные по доле покрытия и числу недостающих.
+        """
+        matched = np.zeros(len(self.recipe_ids), dtype=np.int32)
+        for ingredient_id in set(ingredient_ids):
+            recipe_positions = self.ingredients.get(ingredient_id)
+            if recipe_positions is not None:
+                matched[recipe_positions] += 1
+        mask = matched > 0
+        if tags:
+            tag_mask = np.zeros(len(self.recipe_ids), dtype=bool)
+            for slug in tags:
+                recipe_positions = self.tags.get(slug)
+                if recipe_positions is not None:
+                    tag_mask[recipe_positions] = True
+            mask &= tag_mask
+        if cooking_time_min is not None:
+            mask &= self.cooking_times >= cooking_time_min
+        if cooking_time_max is not None:
+            mask &= self.cooking_times <= cooking_time_max
+        positions = np.flatnonzero(mask)
+        matched = matched[positions]
+        sizes = self.sizes[positions]
+        coverage = matched / sizes
+        missing = sizes - matched
+        order = np.lexsort(
+            (-self.recipe_ids[positions], missing, -coverage)
+        )
+        return [
+            {
+                'id': int(self.recipe_ids[positions[i]]),
+                'matched': int(matched[i]),
+                'missing': int(missing[i]),
+                'coverage': round(float(coverage[i]), 4),
+            }
+            for i in order
+        ]
+
+
+class IngredientIndex:
+    """
+    Обратный индекс в памяти процесса. Изменения рецептов повышают
+    версию в кэше, и каждый процесс лениво пересобирает свой снимок
+    при следующем запросе.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bump_version():
+        cache.set(INDEX_VERSION_KEY, new_version(), None)
+
+    def invalidate(self):
+        """
+        Меняет версию сразу и после фиксации: снимок, собранный
+        конкурентным чтением до фиксации, остается под старой версией.
+        """
+        self.bump_version()
+        transaction.on_commit(self.bump_version)
+
+    def get_snapshot(self):
+        version = cache.get_or_set(INDEX_VERSION_KEY, new_version, None)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = IngredientIndexSnapshot(version)
+            return self._snapshot
+
+    def search(self, *args, **kwargs):
+        return self.get_snapshot().search(*args, **kwargs)
+
+
+ingredient_index = IngredientIndex()
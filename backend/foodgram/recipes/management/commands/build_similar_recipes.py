@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import METRICS, rebuild_similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие рецепты по общим ингредиентам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=settings.SIMILAR_RECIPES_COUNT,
+            help='Сколько похожих рецептов хранить для каждого рецепта.'
+        )
+        parser.add_argument(
+            '--metric', choices=METRICS,
+            default=settings.SIMILAR_RECIPES_METRIC
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_similar_recipes(options['count'], options['metric'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {total}'
+        ))
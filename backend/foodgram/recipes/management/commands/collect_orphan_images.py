@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+IMAGES_DIR = 'recipes/images/'
+
+
+class Command(BaseCommand):
+    help = 'Удаляет изображения рецептов, на которые нет ссылок в базе.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60,
+            help='Не трогать файлы моложе указанного числа минут.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены.'
+        )
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        if not storage.exists(IMAGES_DIR):
+            self.stdout.write('Каталог изображений пуст.')
+            return
+        referenced = set(
+            Recipe.all_objects.exclude(image='').values_list(
+                'image', flat=True
+            )
+        )
+        # Файл новой загрузки появляется раньше, чем запись о рецепте.
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+        removed = 0
+        _, files = storage.listdir(IMAGES_DIR)
+        for filename in files:
+            name = IMAGES_DIR + filename
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > threshold:
+                continue
+            if not options['dry_run']:
+                storage.delete(name)
+            removed += 1
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {removed}'
+            + (' (dry-run)' if options['dry_run'] else '')
+        ))
@@ -0,0 +1,47 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.export import stream_export
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Выгружает данные пользователя в JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help='username или id пользователя.')
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл выгрузки, по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжать выгрузку gzip.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.'
+        )
+
+    def get_user(self, value):
+        lookup = {'pk': value} if value.isdigit() else {'username': value}
+        try:
+            return CustomUser.objects.get(**lookup)
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'Пользователь {value} не найден.')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        blocks = stream_export(user, options['gzip'], options['chunk_size'])
+        if options['output'] == '-':
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+            return
+        with open(options['output'], 'wb') as file:
+            for block in blocks:
+                file.write(block)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка сохранена в {options["output"]}'
+        ))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые записи журнала изменений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHANGES_RETENTION_DAYS,
+            help='Сколько дней хранить записи.'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {deleted}'
+        ))
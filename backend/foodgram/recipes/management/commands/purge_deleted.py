@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.deletion import purge_deleted
+
+
+class Command(BaseCommand):
+    help = 'Удаляет скрытые рецепты и пользователей пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей удалять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Пауза между пачками в секундах.'
+        )
+        parser.add_argument(
+            '--max-batches', type=int, default=None,
+            help='Остановиться после указанного числа пачек.'
+        )
+
+    def handle(self, *args, **options):
+        def on_batch(name, deleted):
+            self.stdout.write(f'{name}: удалено {deleted}')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        batches = purge_deleted(
+            options['batch_size'], on_batch, options['max_batches']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Пачек удалено: {batches}'))
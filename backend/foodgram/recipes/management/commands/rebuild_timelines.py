@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Subscription, TimelineEntry
+from recipes.timeline import backfill_timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок по текущим подпискам.'
+
+    def handle(self, *args, **options):
+        # Читатели ленты видят старые записи, пока пересборка не
+        # зафиксирована, а не пустые ленты.
+        with transaction.atomic():
+            TimelineEntry.objects.all().delete()
+            subscriptions = Subscription.objects.values_list(
+                'user_id', 'author_id'
+            )
+            count = 0
+            for user_id, author_id in subscriptions.iterator():
+                backfill_timeline(user_id, author_id)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано подписок: {count}'
+        ))
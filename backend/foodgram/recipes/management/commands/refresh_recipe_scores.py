@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.scores import refresh_recipe_scores
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает популярность и рейтинг рецептов по избранному.'
+
+    def handle(self, *args, **options):
+        total = refresh_recipe_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {total}'
+        ))
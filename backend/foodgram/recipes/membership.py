@@ -0,0 +1,65 @@
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .ingredient_index import new_version
+from .models import Favorite, ShoppingCart
+
+FAVORITE = 'favorite'
+SHOPPING_CART = 'shopping_cart'
+
+MEMBERSHIP_MODELS = {
+    FAVORITE: Favorite,
+    SHOPPING_CART: ShoppingCart,
+}
+
+
+def get_version_key(kind, user_id):
+    return f'recipe-ids-version:{kind}:{user_id}'
+
+
+def get_cache_key(kind, user_id):
+    version = cache.get_or_set(
+        get_version_key(kind, user_id), new_version, None
+    )
+    return f'recipe-ids:{kind}:{user_id}:{version}'
+
+
+def pack(recipe_ids):
+    """Хранит id отсортированным массивом int64 - 8 байт на рецепт."""
+    return array('q', sorted(recipe_ids)).tobytes()
+
+
+def unpack(packed):
+    recipe_ids = array('q')
+    recipe_ids.frombytes(packed)
+    return frozenset(recipe_ids)
+
+
+def get_recipe_ids(kind, user_id):
+    """Множество id рецептов в избранном или корзине пользователя."""
+    key = get_cache_key(kind, user_id)
+    packed = cache.get(key)
+    if packed is None:
+        packed = pack(MEMBERSHIP_MODELS[kind].objects.filter(
+            user_id=user_id
+        ).values_list('recipe_id', flat=True))
+        cache.set(key, packed, settings.MEMBERSHIP_CACHE_TIMEOUT)
+    return unpack(packed)
+
+
+def bump_version(key):
+    cache.set(key, new_version(), None)
+
+
+def invalidate_recipe_ids(kind, user_id):
+    """
+    Повышает версию множества: оно перечитывается при следующем
+    обращении. Версия повышается и сразу, и после фиксации, поэтому
+    множество, прочитанное до фиксации, остается под старым ключом.
+    """
+    key = get_version_key(kind, user_id)
+    bump_version(key)
+    transaction.on_commit(lambda: bump_version(key))
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.4 on 2026-10-19 07:36
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_auto_20220716_1317'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipeingredientamount',
+            options={'verbose_name': 'Ингредиент', 'verbose_name_plural': 'Количество ингредиентов'},
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(max_length=200, verbose_name='Ингредиент'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentHashStorage(), upload_to='recipes/images/', verbose_name='Изображение блюда'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.0.4 on 2026-10-19 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipedocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('shopping_cart', 'Список покупок'), ('subscription', 'Подписка')], max_length=20, verbose_name='Тип')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Объект')),
+                ('user_id', models.PositiveBigIntegerField(null=True, verbose_name='Владелец')),
+                ('author_id', models.PositiveBigIntegerField(null=True, verbose_name='Автор рецепта')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Удален')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['user_id', 'id'], name='change_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['author_id', 'id'], name='change_author_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.4 on 2026-10-19 08:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def rebase_trending_scores(apps, schema_editor):
+    """Переводит рейтинг со старой эпохи TRENDING_EPOCH на текущий момент."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    TrendingEpoch = apps.get_model('recipes', 'TrendingEpoch')
+    epoch = timezone.now()
+    hours = (epoch - settings.TRENDING_EPOCH).total_seconds() / 3600
+    Recipe.objects.update(trending_score=F('trending_score') * (
+        2 ** (-hours / settings.TRENDING_HALF_LIFE_HOURS)
+    ))
+    TrendingEpoch.objects.create(pk=1, epoch=epoch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField(verbose_name='Эпоха')),
+            ],
+            options={
+                'verbose_name': 'Эпоха рейтинга',
+                'verbose_name_plural': 'Эпоха рейтинга',
+            },
+        ),
+        migrations.RunPython(rebase_trending_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.0.4 on 2026-10-19 08:23
+
+from django.db import migrations, models
+from django.db.models import F, Max, Min
+
+
+def number_changes(apps, schema_editor):
+    """Уже записанные изменения получают номер, равный id."""
+    Change = apps.get_model('recipes', 'Change')
+    ChangeSequence = apps.get_model('recipes', 'ChangeSequence')
+    Change.objects.update(sequence=F('id'))
+    bounds = Change.objects.aggregate(first=Min('id'), last=Max('id'))
+    ChangeSequence.objects.create(
+        pk=1, last=bounds['last'] or 0, pruned=(bounds['first'] or 1) - 1
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_trendingepoch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.PositiveBigIntegerField(default=0, verbose_name='Последний номер')),
+                ('pruned', models.PositiveBigIntegerField(default=0, verbose_name='Удалено до номера')),
+            ],
+            options={
+                'verbose_name': 'Счетчик журнала изменений',
+                'verbose_name_plural': 'Счетчик журнала изменений',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='change_user_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='change_author_idx',
+        ),
+        migrations.AddField(
+            model_name='change',
+            name='sequence',
+            field=models.PositiveBigIntegerField(null=True, unique=True, verbose_name='Номер'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['user_id', 'sequence'], name='change_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['author_id', 'sequence'], name='change_author_idx'),
+        ),
+        migrations.RunPython(number_changes, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,14 @@
 from django.contrib.auth import get_user_model
 from django.core import validators
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from django.db.models import CASCADE, CheckConstraint, F, Q, UniqueConstraint
+from django.db.models import (CASCADE, CheckConstraint, F, Index, Q,
+                              UniqueConstraint)
 
 from colorfield.fields import ColorField
 
+from .storage import recipe_image_storage
+
 CustomUser = get_user_model()
 
 
@@ -76,11 +80,22 @@ class RecipeIngredientAmount(models.Model):
                 fields=('recipe', 'ingredient'),
                 name='unique_ingredient_for_recipe')
         ]
+        indexes = (
+            Index(fields=('ingredient', 'recipe'),
+                  name='ingredient_recipe_idx'),
+        )
 
     def __str__(self) -> str:
         return f'{self.amount} {self.ingredients}'
 
 
+class VisibleRecipeManager(models.Manager):
+    """Скрывает рецепты, ожидающие фонового удаления."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Recipe(models.Model):
     """Модель для рецептов"""
     name = models.CharField(verbose_name='Название блюда',
@@ -93,7 +108,8 @@ class Recipe(models.Model):
                                          related_name='recipes',
                                          through='RecipeIngredientAmount')
     image = models.ImageField(verbose_name='Изображение блюда',
-                              upload_to='recipes/images/')
+                              upload_to='recipes/images/',
+                              storage=recipe_image_storage)
     text = models.TextField(verbose_name='Описание блюда')
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления',
@@ -101,11 +117,33 @@ class Recipe(models.Model):
     )
     pub_date = models.DateTimeField(verbose_name='Дата публикации',
                                     auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+    trending_score = models.FloatField(
+        verbose_name='Рейтинг популярности', default=0, editable=False
+    )
+    deleted_at = models.DateTimeField(
+        verbose_name='Удален', null=True, blank=True, editable=False
+    )
+
+    objects = VisibleRecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            Index(fields=('author', '-pub_date'),
+                  name='recipe_author_pub_date_idx'),
+            Index(fields=('-favorites_count', '-id'),
+                  name='recipe_popular_idx'),
+            Index(fields=('-trending_score', '-id'),
+                  name='recipe_trending_idx'),
+            Index(fields=('cooking_time',),
+                  name='recipe_cooking_time_idx'),
+        )
 
     def __str__(self) -> str:
         return f'{self.name}. Автор: {self.author.username}'
@@ -121,6 +159,8 @@ class Favorite(models.Model):
                                verbose_name='Отборные рецепты',
                                related_name='favorite_recipes',
                                on_delete=models.CASCADE)
+    added_date = models.DateTimeField(verbose_name='Дата добавления',
+                                      auto_now_add=True)
 
     class Meta:
         verbose_name = 'Избранное'
@@ -180,3 +220,190 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Лента подписчика: рецепты авторов, разосланные при публикации."""
+    user = models.ForeignKey(CustomUser, verbose_name='Подписчик',
+                             related_name='timeline',
+                             on_delete=models.CASCADE)
+    recipe = models.ForeignKey(Recipe, verbose_name='Рецепт',
+                               related_name='timeline_entries',
+                               on_delete=models.CASCADE)
+    author = models.ForeignKey(CustomUser, verbose_name='Автор',
+                               related_name='+',
+                               on_delete=models.CASCADE)
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = (
+            UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            Index(fields=('user', '-pub_date', '-recipe'),
+                  name='timeline_user_pub_date_idx'),
+            Index(fields=('user', 'author'),
+                  name='timeline_user_author_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class SimilarRecipe(models.Model):
+    """Предрассчитанные похожие рецепты по общим ингредиентам."""
+    recipe = models.ForeignKey(Recipe, verbose_name='Рецепт',
+                               related_name='similar_recipes',
+                               on_delete=models.CASCADE)
+    similar = models.ForeignKey(Recipe, verbose_name='Похожий рецепт',
+                                related_name='similar_to',
+                                on_delete=models.CASCADE)
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            UniqueConstraint(
+                fields=('recipe', 'similar'), name='unique_similar_recipe'
+            ),
+        )
+        indexes = (
+            Index(fields=('recipe', '-score'),
+                  name='similar_recipe_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.similar} похож на {self.recipe}'
+
+
+class RecipeDocument(models.Model):
+    """
+    Собранное представление рецепта без полей, зависящих от
+    пользователя. Пересобирается при изменении рецепта, его тегов,
+    ингредиентов или автора.
+    """
+    recipe = models.OneToOneField(Recipe, verbose_name='Рецепт',
+                                  primary_key=True,
+                                  related_name='document',
+                                  on_delete=models.CASCADE)
+    data = models.JSONField(verbose_name='Документ')
+    updated = models.DateTimeField(verbose_name='Обновлен', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+    def __str__(self):
+        return f'Документ {self.recipe_id}'
+
+
+class Change(models.Model):
+    """
+    Журнал изменений для дельта-синхронизации клиентов. Номер
+    изменения sequence выдается после фиксации транзакции
+    (recipes.changes.sequence_changes); deleted=True - запись об удалении.
+    """
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    SUBSCRIPTION = 'subscription'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+        (SUBSCRIPTION, 'Подписка'),
+    )
+
+    kind = models.CharField(verbose_name='Тип', max_length=20, choices=KINDS)
+    object_id = models.PositiveBigIntegerField(verbose_name='Объект')
+    # Не внешние ключи: записи об удалении пишутся и при каскадном
+    # удалении пользователя и переживают его.
+    user_id = models.PositiveBigIntegerField(verbose_name='Владелец',
+                                             null=True)
+    author_id = models.PositiveBigIntegerField(verbose_name='Автор рецепта',
+                                               null=True)
+    deleted = models.BooleanField(verbose_name='Удален', default=False)
+    created = models.DateTimeField(verbose_name='Дата', auto_now_add=True)
+    sequence = models.PositiveBigIntegerField(verbose_name='Номер',
+                                              null=True, unique=True)
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = (
+            Index(fields=('user_id', 'sequence'), name='change_user_idx'),
+            Index(fields=('author_id', 'sequence'), name='change_author_idx'),
+        )
+
+    def __str__(self):
+        action = 'удален' if self.deleted else 'изменен'
+        return f'{self.sequence}: {self.kind} {self.object_id} {action}'
+
+
+class ChangeSequence(models.Model):
+    """
+    Счетчик номеров журнала изменений. last - последний выданный
+    номер, pruned - последний номер, удаленный prune_changes.
+    """
+    last = models.PositiveBigIntegerField(verbose_name='Последний номер',
+                                          default=0)
+    pruned = models.PositiveBigIntegerField(verbose_name='Удалено до номера',
+                                            default=0)
+
+    class Meta:
+        verbose_name = 'Счетчик журнала изменений'
+        verbose_name_plural = 'Счетчик журнала изменений'
+
+    def __str__(self):
+        return str(self.last)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Сохраненный ответ на запрос с заголовком Idempotency-Key.
+    Повтор с тем же ключом получает этот ответ без повторной записи.
+    """
+    user = models.ForeignKey(CustomUser, verbose_name='Пользователь',
+                             related_name='idempotency_keys',
+                             on_delete=CASCADE)
+    key = models.CharField(verbose_name='Ключ', max_length=255)
+    fingerprint = models.CharField(verbose_name='Отпечаток запроса',
+                                   max_length=64)
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа', null=True
+    )
+    response = models.JSONField(verbose_name='Ответ', null=True,
+                                encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(verbose_name='Дата', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = (
+            UniqueConstraint(
+                fields=('user', 'key'), name='unique_idempotency_key'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.key}'
+
+
+class TrendingEpoch(models.Model):
+    """
+    Точка отсчета весов trending_score. refresh_recipe_scores сдвигает
+    ее к текущему моменту, чтобы значения оставались небольшими.
+    """
+    epoch = models.DateTimeField(verbose_name='Эпоха')
+
+    class Meta:
+        verbose_name = 'Эпоха рейтинга'
+        verbose_name_plural = 'Эпоха рейтинга'
+
+    def __str__(self):
+        return self.epoch.isoformat()
@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from .models import Favorite, Recipe, TrendingEpoch
+
+BATCH_SIZE = 1000
+EPOCH_PK = 1
+
+
+def get_epoch():
+    epoch, _ = TrendingEpoch.objects.get_or_create(
+        pk=EPOCH_PK, defaults={'epoch': settings.TRENDING_EPOCH}
+    )
+    return epoch.epoch
+
+
+def get_favorite_weight(added_date, epoch=None):
+    """
+    Вес добавления в избранное: 2 ** (часы от эпохи / период
+    полураспада). Сумма весов упорядочивает рецепты так же, как
+    экспоненциально затухающий счетчик, но не требует пересчета
+    старых значений со временем. Эпоха регулярно переносится
+    вперед, поэтому веса остаются порядка единицы, и прибавление
+    и вычитание одного веса не теряют точность.
+    """
+    if epoch is None:
+        epoch = get_epoch()
+    hours = (added_date - epoch).total_seconds() / 3600
+    return 2 ** (hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def favorite_added(favorite):
+    Recipe.objects.filter(pk=favorite.recipe_id).update(
+        favorites_count=F('favorites_count') + 1,
+        trending_score=F('trending_score')
+        + get_favorite_weight(favorite.added_date)
+    )
+
+
+def favorite_removed(favorite):
+    Recipe.objects.filter(pk=favorite.recipe_id).update(
+        favorites_count=F('favorites_count') - 1,
+        trending_score=F('trending_score')
+        - get_favorite_weight(favorite.added_date)
+    )
+
+
+def update_favorite_scores(favorites, sign):
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) избранное одним UPDATE.
+    favorites - пары (recipe_id, added_date) одного пользователя, по
+    одной на рецепт; вес считается по сохраненной added_date каждой.
+    """
+    epoch = get_epoch()
+    weights = {
+        recipe_id: sign * get_favorite_weight(added_date, epoch)
+        for recipe_id, added_date in favorites
+    }
+    if not weights:
+        return
+    Recipe.objects.filter(pk__in=weights).update(
+        favorites_count=F('favorites_count') + sign,
+        trending_score=F('trending_score') + Case(
+            *(When(pk=recipe_id, then=Value(weight))
+              for recipe_id, weight in weights.items()),
+            output_field=FloatField()
+        )
+    )
+
+
+def favorites_bulk_added(favorites):
+    """Учитывает избранное, созданное через bulk_create без сигналов."""
+    update_favorite_scores(
+        favorites.values_list('recipe_id', 'added_date'), 1
+    )
+
+
+def favorites_bulk_removed(favorites):
+    """
+    Вычитает избранное, удаленное без сигналов. favorites - пары
+    (recipe_id, added_date), прочитанные до удаления.
+    """
+    update_favorite_scores(favorites, -1)
+
+
+def refresh_recipe_scores():
+    """
+    Пересчитывает счетчики и рейтинг всех рецептов по избранному
+    и переносит эпоху на текущий момент. Строка эпохи заблокирована
+    до конца пересчета. Вес, посчитанный параллельно от старой эпохи,
+    исправит следующий пересчет.
+    """
+    with transaction.atomic():
+        epoch, _ = TrendingEpoch.objects.select_for_update().get_or_create(
+            pk=EPOCH_PK, defaults={'epoch': settings.TRENDING_EPOCH}
+        )
+        epoch.epoch = timezone.now()
+        counts = defaultdict(int)
+        scores = defaultdict(float)
+        favorites = Favorite.objects.values_list('recipe_id', 'added_date')
+        for recipe_id, added_date in favorites.iterator():
+            counts[recipe_id] += 1
+            scores[recipe_id] += get_favorite_weight(added_date, epoch.epoch)
+        recipes = []
+        for recipe in Recipe.all_objects.only(
+            'id', 'favorites_count', 'trending_score'
+        ).iterator():
+            recipe.favorites_count = counts[recipe.id]
+            recipe.trending_score = scores[recipe.id]
+            recipes.append(recipe)
+        Recipe.all_objects.bulk_update(
+            recipes, ('favorites_count', 'trending_score'),
+            batch_size=BATCH_SIZE
+        )
+        epoch.save(update_fields=('epoch',))
+    return len(recipes)
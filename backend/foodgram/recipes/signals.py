@@ -0,0 +1,123 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .changes import log_changes, log_recipe_change
+from .facets import invalidate_tag_facets
+from .ingredient_index import ingredient_index
+from .membership import FAVORITE, SHOPPING_CART, invalidate_recipe_ids
+from .models import (Change, Favorite, Recipe, RecipeIngredientAmount,
+                     ShoppingCart, Subscription, Tag)
+from .scores import favorite_added, favorite_removed
+from .tag_slugs import tag_slug_map
+from .timeline import (backfill_timeline, fan_out_recipe, followers_changed,
+                       prune_timeline)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        followers_changed([instance.author_id], 1)
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    followers_changed([instance.author_id], -1)
+    prune_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        favorite_added(instance)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    favorite_removed(instance)
+
+
+MEMBERSHIP_KINDS = {Favorite: FAVORITE, ShoppingCart: SHOPPING_CART}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def membership_created(sender, instance, created, **kwargs):
+    if created:
+        invalidate_recipe_ids(MEMBERSHIP_KINDS[sender], instance.user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def membership_deleted(sender, instance, **kwargs):
+    invalidate_recipe_ids(MEMBERSHIP_KINDS[sender], instance.user_id)
+
+
+# RecipeWriteSerializer создает ингредиенты через bulk_create, но
+# при создании затем выставляет теги, а при обновлении сохраняет
+# рецепт последним, так что индекс сбрасывается после всех записей.
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredientAmount)
+@receiver(post_delete, sender=RecipeIngredientAmount)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_index_changed(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    tag_slug_map.invalidate()
+    invalidate_tag_facets()
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, **kwargs):
+    invalidate_tag_facets()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_change_logged(sender, instance, **kwargs):
+    log_recipe_change(instance, deleted=instance.deleted_at is not None)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deletion_logged(sender, instance, **kwargs):
+    log_recipe_change(instance, deleted=True)
+
+
+CHANGE_KINDS = {
+    Favorite: (Change.FAVORITE, 'recipe_id'),
+    ShoppingCart: (Change.SHOPPING_CART, 'recipe_id'),
+    Subscription: (Change.SUBSCRIPTION, 'author_id'),
+}
+
+
+def log_user_change(sender, instance, deleted):
+    kind, field = CHANGE_KINDS[sender]
+    log_changes(kind, (getattr(instance, field),), user_id=instance.user_id,
+                deleted=deleted)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+def user_change_logged(sender, instance, created, **kwargs):
+    if created:
+        log_user_change(sender, instance, deleted=False)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+def user_deletion_logged(sender, instance, **kwargs):
+    log_user_change(sender, instance, deleted=True)
@@ -0,0 +1,220 @@
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import RecipeIngredientAmount, SimilarRecipe
+
+BLOCK_SIZE = 256
+BATCH_SIZE = 1000
+METRICS = ('jaccard', 'cosine')
+# Скрытые рецепты не занимают места в списках похожих.
+VISIBLE = {'recipe__deleted_at__isnull': True}
+
+
+def get_scores(intersections, sizes, other_sizes, metric):
+    """Сходство бинарных векторов ингредиентов по размеру пересечения."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'cosine':
+            scores = intersections / np.sqrt(sizes * other_sizes)
+        else:
+            scores = intersections / (sizes + other_sizes - intersections)
+    return np.nan_to_num(scores, copy=False)
+
+
+class CSRMatrix(namedtuple('CSRMatrix', 'indptr indices n_columns')):
+    """
+    Разреженная бинарная матрица в формате CSR: столбцы строки i -
+    indices[indptr[i]:indptr[i + 1]].
+    """
+
+    @property
+    def n_rows(self):
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_pairs(cls, rows, columns, n_rows, n_columns):
+        order = np.lexsort((columns, rows))
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(indptr, columns[order], n_columns)
+
+    def transpose(self):
+        rows = np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+        return CSRMatrix.from_pairs(
+            self.indices, rows, self.n_columns, self.n_rows
+        )
+
+
+def build_matrix():
+    """
+    Строит разреженную бинарную матрицу рецепт x ингредиент. Память
+    пропорциональна числу пар рецепт-ингредиент, а не их произведению.
+    """
+    pairs = np.array(
+        RecipeIngredientAmount.objects.filter(**VISIBLE).values_list(
+            'recipe_id', 'ingredient_id'
+        ),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    ingredient_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+    return recipe_ids, CSRMatrix.from_pairs(
+        rows.ravel(), columns.ravel(), len(recipe_ids), len(ingredient_ids)
+    )
+
+
+def expand_ranges(starts, lengths):
+    """Склеивает диапазоны [start, start + length) в один массив."""
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(lengths.sum()) - offsets + np.repeat(starts, lengths)
+
+
+def get_block_intersections(matrix, transposed, start, stop):
+    """
+    Ненулевые пересечения строк start:stop со всеми строками матрицы.
+    Для каждого ингредиента строки блока перебираются рецепты из его
+    столбца, пары считаются через np.unique. Возвращает номер строки
+    в блоке, номер другой строки и размер пересечения.
+    """
+    lengths = np.diff(matrix.indptr[start:stop + 1])
+    block_rows = np.repeat(np.arange(stop - start), lengths)
+    columns = matrix.indices[matrix.indptr[start]:matrix.indptr[stop]]
+    firsts = transposed.indptr[columns]
+    column_lengths = transposed.indptr[columns + 1] - firsts
+    others = transposed.indices[expand_ranges(firsts, column_lengths)]
+    keys, intersections = np.unique(
+        np.repeat(block_rows, column_lengths) * matrix.n_rows + others,
+        return_counts=True
+    )
+    return keys // matrix.n_rows, keys % matrix.n_rows, intersections
+
+
+def compute_neighbours(recipe_ids, matrix, count, metric):
+    """Находит count ближайших рецептов для каждой строки матрицы."""
+    total = len(recipe_ids)
+    count = min(count, total - 1)
+    if count < 1:
+        return
+    transposed = matrix.transpose()
+    sizes = np.diff(matrix.indptr).astype(np.float32)
+    for start in range(0, total, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, total)
+        block_rows, others, intersections = get_block_intersections(
+            matrix, transposed, start, stop
+        )
+        not_self = others != start + block_rows
+        block_rows = block_rows[not_self]
+        others = others[not_self]
+        scores = get_scores(
+            intersections[not_self].astype(np.float32),
+            sizes[start + block_rows], sizes[others], metric
+        )
+        order = np.lexsort((-scores, block_rows))
+        block_rows, others, scores = (
+            block_rows[order], others[order], scores[order]
+        )
+        firsts = np.searchsorted(block_rows, np.arange(stop - start + 1))
+        for row in range(stop - start):
+            first = firsts[row]
+            last = min(firsts[row + 1], first + count)
+            yield recipe_ids[start + row], [
+                (recipe_ids[others[i]], scores[i])
+                for i in range(first, last) if scores[i] > 0
+            ]
+
+
+def rebuild_similar_recipes(count=None, metric=None):
+    """Полный пересчет таблицы похожих рецептов."""
+    count = count or settings.SIMILAR_RECIPES_COUNT
+    metric = metric or settings.SIMILAR_RECIPES_METRIC
+    recipe_ids, matrix = build_matrix()
+    rows = [
+        SimilarRecipe(recipe_id=int(recipe_id), similar_id=int(similar_id),
+                      score=float(score))
+        for recipe_id, neighbours in compute_neighbours(
+            recipe_ids, matrix, count, metric
+        )
+        for similar_id, score in neighbours
+    ]
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        SimilarRecipe.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(recipe_ids)
+
+
+def get_candidate_scores(recipe_id, metric):
+    """Сходство рецепта со всеми рецептами, имеющими общие ингредиенты."""
+    ingredient_ids = RecipeIngredientAmount.objects.filter(
+        recipe_id=recipe_id
+    ).values('ingredient_id')
+    intersections = dict(
+        RecipeIngredientAmount.objects.filter(
+            ingredient_id__in=ingredient_ids, **VISIBLE
+        ).exclude(recipe_id=recipe_id).values('recipe_id').annotate(
+            intersection=Count('id')
+        ).values_list('recipe_id', 'intersection')
+    )
+    candidate_ids = np.fromiter(intersections, dtype=np.int64)
+    if not len(candidate_ids):
+        return candidate_ids, np.zeros(0, dtype=np.float32)
+    sizes = dict(
+        RecipeIngredientAmount.objects.filter(
+            recipe_id__in=list(intersections) + [recipe_id]
+        ).values('recipe_id').annotate(size=Count('id')).values_list(
+            'recipe_id', 'size'
+        )
+    )
+    scores = get_scores(
+        np.fromiter(intersections.values(), dtype=np.float32),
+        np.float32(sizes[recipe_id]),
+        np.array([sizes[pk] for pk in intersections], dtype=np.float32),
+        metric
+    )
+    return candidate_ids, scores
+
+
+def update_similar_recipes(recipe_id, count=None, metric=None):
+    """
+    Пересчитывает соседей одного рецепта после правки и вставляет
+    его в списки тех рецептов, где он вытесняет худшего соседа.
+    Списки кандидатов читаются одним запросом, вытесненные соседи
+    удаляются одним DELETE. Рецепты, из списков которых он выпал,
+    дополнит полный пересчет.
+    """
+    count = count or settings.SIMILAR_RECIPES_COUNT
+    metric = metric or settings.SIMILAR_RECIPES_METRIC
+    candidate_ids, scores = get_candidate_scores(recipe_id, metric)
+    top = np.argsort(-scores, kind='stable')[:count]
+    rows = [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=int(candidate_ids[i]),
+                      score=float(scores[i]))
+        for i in top if scores[i] > 0
+    ]
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            Q(recipe_id=recipe_id) | Q(similar_id=recipe_id)
+        ).delete()
+        lists = {}
+        for candidate_id, pk, score in SimilarRecipe.objects.filter(
+            recipe_id__in=candidate_ids.tolist()
+        ).order_by('recipe_id', 'score', 'id').values_list(
+            'recipe_id', 'pk', 'score'
+        ):
+            lists.setdefault(candidate_id, []).append((pk, score))
+        displaced = []
+        for candidate_id, score in zip(candidate_ids.tolist(), scores):
+            current = lists.get(candidate_id, ())
+            if len(current) >= count:
+                worst_pk, worst_score = current[0]
+                if score <= worst_score:
+                    continue
+                displaced.append(worst_pk)
+            rows.append(SimilarRecipe(recipe_id=candidate_id,
+                                      similar_id=recipe_id,
+                                      score=float(score)))
+        if displaced:
+            SimilarRecipe.objects.filter(pk__in=displaced).delete()
+        SimilarRecipe.objects.bulk_create(rows, batch_size=BATCH_SIZE)
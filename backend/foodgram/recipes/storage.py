@@ -0,0 +1,76 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def get_content_hash(content):
+    """Считает sha256 содержимого файла, не загружая его целиком."""
+    sha256 = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha256.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha256.hexdigest()
+
+
+def get_hash_from_name(name):
+    """Достает хэш из имени файла, сохраненного ContentHashStorage."""
+    if not name:
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище, адресующее файлы по хэшу содержимого.
+    Файл сохраняется как <каталог>/<sha256>.<расширение>;
+    если такой файл уже есть, повторная запись не выполняется.
+    """
+
+    def generate_hashed_name(self, name, content):
+        dirname, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(dirname, f'{get_content_hash(content)}{ext}')
+
+    def touch(self, name):
+        """
+        Обновляет время изменения существующего файла: сборщик сирот
+        с --min-age не удалит файл, на который только что сослались.
+        Возвращает False, если файла уже нет.
+        """
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.generate_hashed_name(name, content)
+        if self.exists(name) and self.touch(name):
+            return name.replace('\\', '/')
+        try:
+            return super().save(name, content, max_length)
+        except FileExistsError:
+            # Тот же файл успел записать параллельный запрос.
+            self.touch(name)
+            return name.replace('\\', '/')
+
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя означает одинаковое содержимое,
+        # поэтому вместо подбора суффикса прерываем запись.
+        if self.exists(name):
+            raise FileExistsError(name)
+        return super().get_available_name(name, max_length)
+
+
+recipe_image_storage = ContentHashStorage()
@@ -0,0 +1,52 @@
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .ingredient_index import new_version
+from .models import Tag
+
+SLUG_MAP_VERSION_KEY = 'tag-slug-map-version'
+
+
+class TagSlugMap:
+    """
+    Соответствие slug -> id тегов в памяти процесса. Изменения тегов
+    повышают версию в кэше, и каждый процесс перечитывает теги при
+    следующем запросе.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bump_version():
+        cache.set(SLUG_MAP_VERSION_KEY, new_version(), None)
+
+    def invalidate(self):
+        """Меняет версию сразу и после фиксации изменения тегов."""
+        self.bump_version()
+        transaction.on_commit(self.bump_version)
+
+    def get_map(self):
+        version = cache.get_or_set(SLUG_MAP_VERSION_KEY, new_version, None)
+        if self._version == version:
+            return self._ids
+        with self._lock:
+            if self._version != version:
+                self._ids = dict(Tag.objects.values_list('slug', 'id'))
+                self._version = version
+            return self._ids
+
+    def get_ids(self, slugs):
+        ids = self.get_map()
+        return [ids[slug] for slug in slugs if slug in ids]
+
+
+tag_slug_map = TagSlugMap()
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in tag_slug_map.get_map()]
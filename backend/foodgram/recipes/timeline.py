@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Recipe, Subscription, TimelineEntry
+from users.models import CustomUser
+
+
+def followers_changed(author_ids, delta):
+    """
+    Сдвигает счетчик подписчиков авторов на delta. Автор, набравший
+    FEED_FANOUT_FOLLOWER_LIMIT, остается без рассылки и после отписок:
+    его рецепты домешиваются при чтении целиком, и лента не теряет
+    записей, которые не были разосланы.
+    """
+    authors = CustomUser.objects.filter(id__in=author_ids)
+    authors.update(followers_count=F('followers_count') + delta)
+    if delta > 0:
+        authors.filter(
+            fanout_disabled=False,
+            followers_count__gte=settings.FEED_FANOUT_FOLLOWER_LIMIT
+        ).update(fanout_disabled=True)
+
+
+def is_popular(author):
+    """Рецепты популярных авторов не рассылаются, а домешиваются при чтении."""
+    return CustomUser.objects.filter(
+        pk=author, fanout_disabled=True
+    ).exists()
+
+
+def get_popular_author_ids(user):
+    return list(Subscription.objects.filter(
+        user=user, author__fanout_disabled=True
+    ).values_list('author_id', flat=True))
+
+
+def fan_out_recipe(recipe):
+    """Рассылает новый рецепт в ленты подписчиков автора."""
+    if is_popular(recipe.author_id):
+        return
+    follower_ids = Subscription.objects.filter(
+        author=recipe.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=follower_id, recipe=recipe,
+                          author_id=recipe.author_id,
+                          pub_date=recipe.pub_date)
+            for follower_id in follower_ids
+        ],
+        ignore_conflicts=True
+    )
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if is_popular(author_id):
+        return
+    recipes = Recipe.objects.filter(author=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:settings.FEED_BACKFILL_LIMIT]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, recipe_id=recipe_id,
+                          author_id=author_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        ],
+        ignore_conflicts=True
+    )
+
+
+def prune_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+def after_cursor(queryset, cursor, id_field):
+    if cursor is None:
+        return queryset
+    pub_date, pk = cursor
+    return queryset.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, **{f'{id_field}__lt': pk})
+    )
+
+
+def get_feed_entries(user, limit, cursor=None):
+    """
+    Возвращает до limit + 1 пар (pub_date, recipe_id) ленты после cursor.
+    Разосланные записи объединяются с рецептами популярных авторов.
+    Записи скрытых рецептов пропускаются до удаления purge_deleted.
+    """
+    entries = set(
+        after_cursor(
+            TimelineEntry.objects.filter(
+                user=user, recipe__deleted_at__isnull=True
+            ),
+            cursor, 'recipe_id'
+        ).order_by('-pub_date', '-recipe_id').values_list(
+            'pub_date', 'recipe_id'
+        )[:limit + 1]
+    )
+    popular_author_ids = get_popular_author_ids(user)
+    if popular_author_ids:
+        entries.update(
+            after_cursor(
+                Recipe.objects.filter(author__in=popular_author_ids),
+                cursor, 'id'
+            ).order_by('-pub_date', '-id').values_list(
+                'pub_date', 'id'
+            )[:limit + 1]
+        )
+    return sorted(entries, reverse=True)[:limit + 1]
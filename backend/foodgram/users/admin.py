@@ -1,6 +1,7 @@
 from django.contrib.admin import ModelAdmin, register
 
 from .models import CustomUser
+from recipes.deletion import hide_user
 
 
 @register(CustomUser)
@@ -19,3 +20,13 @@ class CustomUserAdmin(ModelAdmin):
     )
     list_filter = ('email', 'first_name')
     search_fields = ('email', 'first_name')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(deleted_at__isnull=True)
+
+    def delete_model(self, request, obj):
+        hide_user(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            hide_user(user)
@@ -0,0 +1,41 @@
+# Generated by Django 4.0.4 on 2026-10-19 09:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_followers_count(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Subscription = apps.get_model('recipes', 'Subscription')
+    CustomUser.objects.update(followers_count=Coalesce(Subquery(
+        Subscription.objects.filter(author=OuterRef('pk')).values(
+            'author'
+        ).annotate(total=Count('pk')).values('total')
+    ), 0))
+    CustomUser.objects.filter(
+        followers_count__gte=settings.FEED_FANOUT_FOLLOWER_LIMIT
+    ).update(fanout_disabled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_customuser_deleted_at'),
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='fanout_disabled',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Рецепты не рассылаются в ленты'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.RunPython(fill_followers_count, migrations.RunPython.noop),
+    ]
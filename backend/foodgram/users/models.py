@@ -23,6 +23,14 @@ class CustomUser(AbstractUser):
                                  max_length=150)
     email = models.EmailField(verbose_name='Адрес электронной почты',
                               max_length=254, unique=True)
+    deleted_at = models.DateTimeField(verbose_name='Удален', null=True,
+                                      blank=True, editable=False)
+    followers_count = models.PositiveIntegerField(verbose_name='Подписчиков',
+                                                  default=0, editable=False)
+    fanout_disabled = models.BooleanField(
+        verbose_name='Рецепты не рассылаются в ленты', default=False,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'password']